@@ -1,10 +1,23 @@
-file_organizer.py
+# file_organizer.py
 
 import os
 import pathlib
-import shutil
+import select
+import struct
 import csv
+import argparse
+import contextlib
+import errno
+import json
+import mmap
+import sqlite3
+import stat
+import sys
+import threading
+import time
 from datetime import datetime
+# concurrent.futures (which loads logging), shutil and hashlib are imported by the functions that
+# use them, so --dry-run, --list-runs and cli.py start without paying for them
 
 # --- Configuration ---
 
@@ -72,8 +85,203 @@ FILE_TYPE_MAPPINGS = {
 # Name for the folder if the file type is not in the mappings
 OTHER_FOLDER_NAME = "Others"
 
+# --- Pipeline mode settings (used with --pipeline) ---
+
+# Number of files moved in parallel. Moves are I/O bound, so this can exceed the CPU count.
+MAX_WORKERS = 8
+
+# Log rows buffered in memory before they are written to LOG_FILE
+LOG_FLUSH_ROWS = 500
+
+# Print a progress line every this many files instead of one line per file
+PROGRESS_EVERY = 1000
+
+# What to do when a file with the same name is already in the category folder:
+# "rename" moves it as "name (1).ext", "name (2).ext", ...; "skip" leaves it in the source folder
+ON_CONFLICT = "rename"
+
+# --- Recursive mode settings (used with --recursive) ---
+
+# Journal of finished directory trees, kept in DEST_DIR so an interrupted run can resume
+JOURNAL_NAME = "organize_journal.txt"
+
+# Moves queued on the thread pool at any time; keeps memory bounded on huge trees
+MAX_IN_FLIGHT = MAX_WORKERS * 4
+
+# Names of a category folder kept in memory for conflict checks; past this, that folder is checked on disk
+DEST_INDEX_MAX_NAMES = 100_000
+
+# --- Cross-device copy settings ---
+
+# Bytes handed to the kernel per copy call when source and destination are on different filesystems
+COPY_CHUNK_BYTES = 64 * 1024 * 1024
+
+# Buffer for copies through user space (no kernel-side copy, e.g. on macOS); one per busy worker
+COPY_BUFFER_BYTES = 1024 * 1024
+
+# Files at least this big get their own progress lines while being copied
+LARGE_FILE_BYTES = 100 * 1024 * 1024
+
+# Minimum time between two progress lines
+PROGRESS_SECONDS = 1.0
+
+# --- Duplicate detection settings (used with --dedupe) ---
+
+# Bytes hashed from the start and from the end of a file for the quick comparison
+HASH_EDGE_BYTES = 4 * 1024
+
+# Hashes cached by (device, inode, size, mtime) in DEST_DIR, so repeat runs only hash new files
+HASH_CACHE_NAME = "hash_cache.sqlite3"
+
+# Duplicate report written to DEST_DIR
+DUPLICATES_REPORT_NAME = "duplicates_report.csv"
+
+# Processes used for full-content hashing
+HASH_WORKERS = os.cpu_count() or 4
+
+# --- Content sniffing settings (pipeline and recursive mode) ---
+
+# Files whose extension is not in FILE_TYPE_MAPPINGS are identified by their first bytes
+SNIFF_CONTENT = True
+
+# Bytes read from the start of a file to identify it
+SNIFF_BYTES = 512
+
+# Bytes read from the end of a ZIP file that looks like an Office document (its central directory)
+ZIP_TAIL_BYTES = 4096
+
+# Files read in parallel per batch
+SNIFF_BATCH = 256
+
+# Results cached by (device, inode, size, mtime) in DEST_DIR, so re-runs do not read the files again
+SNIFF_CACHE_NAME = "sniff_cache.sqlite3"
+
+# (offset, signature, folder) checked in order against the first SNIFF_BYTES of a file.
+# Container formats (RIFF, MP4/QuickTime, ZIP/Office) and markup are recognized in sniff_category().
+MAGIC_SIGNATURES = [
+    (0, b"\x89PNG\r\n\x1a\n", "Images"),
+    (0, b"\xff\xd8\xff", "Images"), # JPEG
+    (0, b"GIF87a", "Images"),
+    (0, b"GIF89a", "Images"),
+    (0, b"II*\x00", "Images"), # TIFF, little-endian
+    (0, b"MM\x00*", "Images"), # TIFF, big-endian
+    (0, b"%PDF-", "Documents"),
+    (0, b"{\\rtf", "Documents"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "Documents"), # Old Office formats (OLE2)
+    (0, b"Rar!\x1a\x07", "Archives"),
+    (0, b"7z\xbc\xaf\x27\x1c", "Archives"),
+    (0, b"\x1f\x8b", "Archives"), # gzip
+    (0, b"BZh", "Archives"), # bzip2
+    (0, b"\xfd7zXZ\x00", "Archives"), # xz
+    (257, b"ustar", "Archives"), # tar
+    (0, b"ID3", "Audio"), # MP3 with tags
+    (0, b"\xff\xfb", "Audio"), # MP3 frame
+    (0, b"fLaC", "Audio"),
+    (0, b"OggS", "Audio"),
+    (0, b"\x1a\x45\xdf\xa3", "Video"), # Matroska / WebM
+    (0, b"\x7fELF", "Executables"),
+    (0, b"MZ", "Executables"), # Windows PE
+    (0, b"\xcf\xfa\xed\xfe", "Executables"), # Mach-O
+    (0, b"#!", "Scripts"),
+]
+
+# Part names inside a ZIP that identify Office Open XML and OpenDocument files
+ZIP_MEMBER_FOLDERS = [
+    (b"word/", "Documents"),
+    (b"xl/", "Spreadsheets"),
+    (b"ppt/", "Presentations"),
+    (b"opendocument.text", "Documents"),
+    (b"opendocument.spreadsheet", "Spreadsheets"),
+    (b"opendocument.presentation", "Presentations"),
+]
+
+# --- Run log settings ---
+
+# Indexed copy of the move log in DEST_DIR; every run gets a run ID that --undo can reverse
+RUN_LOG_NAME = "organization_log.sqlite3"
+
+# Logged moves read and reversed per batch by --undo
+UNDO_BATCH = 1000
+
+# --- Watch mode settings (used with --watch) ---
+
+# A new file is moved once its size and mtime have not changed for this long
+WATCH_SETTLE_SECONDS = 2.0
+
+# How often files waiting to settle are re-checked
+WATCH_CHECK_SECONDS = 0.5
+
+# How often SOURCE_DIR's mtime is polled where inotify is not available
+WATCH_POLL_SECONDS = 2.0
+
+# Unfinished downloads and temporary files are never moved, whatever their size does
+WATCH_IGNORE_SUFFIXES = (".part", ".crdownload", ".download", ".tmp", ".partial")
+
+# --- Profiling settings (used with --profile) ---
+
+# Phase timings of every profiled run are appended to this JSON-lines file in DEST_DIR
+PROFILE_STATS_NAME = "profile_stats.jsonl"
+
+# Set to a RunProfile by --profile; phases are only timed while it is not None
+PROFILE = None
+
 # --- Functions ---
 
+class RunProfile:
+    """Wall time spent in each phase of a run (scan, categorize, plan, move, log, ...), for --profile.
+
+    Time is summed per phase over the whole run. Phases can overlap: log rows
+    are flushed by the thread collecting finished moves, so "log" is also part
+    of "move". Thread-safe.
+    """
+
+    def __init__(self):
+        self.seconds = {} # phase -> seconds, in the order the phases first ran
+        self.counts = {} # files, bytes, ... noted at the end of the run
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.seconds[name] = self.seconds.get(name, 0.0) + elapsed
+
+    def note(self, **counts):
+        """Records totals of the run (e.g. files=..., bytes=...) for the stats file."""
+        self.counts.update(counts)
+
+    def report(self, mode, stats_file=None):
+        """Prints the phase timings and appends them as one JSON line to stats_file, if given."""
+        total = time.perf_counter() - self._start
+        print("-" * 30)
+        print("Profile:")
+        for name, seconds in self.seconds.items():
+            print(f"  {name:<11} {seconds * 1000:10.1f} ms")
+        print(f"  {'total':<11} {total * 1000:10.1f} ms")
+        if stats_file is None:
+            return
+        record = {"timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "mode": mode,
+                  "source": str(SOURCE_DIR), "dest": str(DEST_DIR), **self.counts,
+                  "total_ms": round(total * 1000, 1),
+                  "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.seconds.items()}}
+        try:
+            with open(stats_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+            print(f"Profile stats appended to: {stats_file}")
+        except OSError as e:
+            print(f"Error writing profile stats {stats_file}: {e}")
+
+
+def profile_phase(name):
+    """Times a phase of the run into PROFILE; does nothing without --profile."""
+    return PROFILE.phase(name) if PROFILE is not None else contextlib.nullcontext()
+
+
 def setup_logging():
     """Creates the destination directory and initializes the CSV log file if needed."""
     DEST_DIR.mkdir(parents=True, exist_ok=True) # Create destination if it doesn't exist
@@ -100,56 +308,1297 @@ def log_action(original_path, new_path, file_type):
     except Exception as e:
          print(f"An unexpected error occurred during logging: {e}")
 
-def organize_files():
-    """Scans the source directory and moves files to the destination directory."""
+class RunLog:
+    """SQLite log of every move, indexed by run ID, so one run can be listed or undone quickly.
+
+    The CSV log stays the human-readable record; this one is written next to it
+    with the same rows. add() may be called from several threads as long as the
+    caller serializes the calls (BufferedLogWriter does, under its lock).
+    """
+
+    def __init__(self, db_file, mode):
+        self.conn = sqlite3.connect(str(db_file), timeout=30, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY, started TEXT, mode TEXT, source TEXT, dest TEXT);
+            CREATE TABLE IF NOT EXISTS moves (
+                id INTEGER PRIMARY KEY, run_id TEXT NOT NULL, timestamp TEXT,
+                original_path TEXT, new_path TEXT, file_type TEXT, undone INTEGER NOT NULL DEFAULT 0);
+            CREATE INDEX IF NOT EXISTS moves_run ON moves(run_id, id);
+        """)
+        now = datetime.now()
+        self.run_id = f"{now:%Y%m%d-%H%M%S}-{os.urandom(2).hex()}"
+        self.conn.execute("INSERT INTO runs(run_id, started, mode, source, dest) VALUES (?, ?, ?, ?, ?)",
+                          (self.run_id, f"{now:%Y-%m-%d %H:%M:%S}", mode, str(SOURCE_DIR), str(DEST_DIR)))
+        self.conn.commit()
+        print(f"Run ID: {self.run_id}")
+
+    def add(self, rows):
+        """Stores [timestamp, original_path, new_path, file_type] rows."""
+        self.conn.executemany(
+            "INSERT INTO moves(run_id, timestamp, original_path, new_path, file_type) VALUES (?, ?, ?, ?, ?)",
+            [(self.run_id, *row) for row in rows])
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+class BufferedLogWriter:
+    """Keeps LOG_FILE open for the whole run and writes rows in batches.
+
+    Thread-safe, so move workers can log directly. Use as a context manager so
+    the last rows are flushed even if the run fails. Rows also go to run_log
+    (a RunLog) if given, which is closed together with the writer.
+    """
+
+    def __init__(self, log_file, flush_rows=LOG_FLUSH_ROWS, run_log=None):
+        self.log_file = log_file
+        self.flush_rows = flush_rows
+        self.run_log = run_log
+        self._rows = []
+        self._lock = threading.Lock()
+        self._file = None
+        self._writer = None
+
+    def open(self):
+        self._file = open(self.log_file, 'a', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        return self
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def log(self, original_path, new_path, file_type):
+        """Queues one log row; flushes when the buffer is full."""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            self._rows.append([timestamp, str(original_path), str(new_path), file_type])
+            if len(self._rows) >= self.flush_rows:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._rows:
+            return
+        with profile_phase("log"):
+            # Written independently, so a failure in one log does not cost the rows of the other
+            try:
+                self._writer.writerows(self._rows)
+                self._file.flush()
+            except IOError as e:
+                print(f"Error writing to log file {self.log_file}: {e}")
+            if self.run_log is not None:
+                try:
+                    self.run_log.add(self._rows)
+                except sqlite3.Error as e:
+                    print(f"Error writing to run log: {e}")
+        self._rows = []
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+            if self.run_log is not None:
+                self.run_log.close()
+
+
+class DestinationIndex:
+    """In-memory set of the names in each category folder, loaded once per folder.
+
+    Name-conflict checks and collision-free renames are done against these sets
+    instead of one exists() call per file, and names handed out during the run
+    are added so later files in the same batch see them too. On Windows and
+    macOS names are compared case-insensitively, like the filesystems there.
+
+    With max_names, a folder whose set grows past it is dropped and checked with
+    lexists() from then on, so memory stays bounded on huge runs. Only names not
+    yet on disk are still kept: the caller must release() each claimed name once
+    its move is finished (or failed).
+    """
+
+    def __init__(self, dest_dir, max_names=None):
+        self.dest_dir = dest_dir
+        self.max_names = max_names
+        self._names = {} # target_folder_name -> set of (normalized) names, None once checked on disk
+        self._pending = {} # target_folder_name -> names claimed and not released yet (max_names only)
+        self._fold = os.name == "nt" or sys.platform == "darwin"
+
+    def _key(self, name):
+        return name.casefold() if self._fold else name
+
+    def _folder_names(self, target_folder_name):
+        if target_folder_name in self._names:
+            return self._names[target_folder_name]
+        try:
+            names = {self._key(name) for name in os.listdir(self.dest_dir / target_folder_name)}
+        except FileNotFoundError:
+            names = set() # Folder is created when the first file moves in
+        if self.max_names is not None and len(names) > self.max_names:
+            names = None
+        self._names[target_folder_name] = names
+        return names
+
+    def _taken(self, target_folder_name, names, name):
+        if names is not None:
+            return self._key(name) in names
+        return (self._key(name) in self._pending.get(target_folder_name, ())
+                or os.path.lexists(self.dest_dir / target_folder_name / name))
+
+    def claim(self, target_folder_name, name, on_conflict=ON_CONFLICT):
+        """Reserves a destination name in the folder and returns it.
+
+        Returns the name itself if free; otherwise "stem (n).ext" with the lowest
+        free n when on_conflict is "rename", or None when it is "skip".
+        """
+        names = self._folder_names(target_folder_name)
+        candidate = name
+        if self._taken(target_folder_name, names, candidate):
+            if on_conflict != "rename":
+                return None
+            stem, ext = os.path.splitext(name)
+            counter = 1
+            while True:
+                candidate = f"{stem} ({counter}){ext}"
+                if not self._taken(target_folder_name, names, candidate):
+                    break
+                counter += 1
+        if names is not None:
+            names.add(self._key(candidate))
+            if self.max_names is not None and len(names) > self.max_names:
+                self._names[target_folder_name] = None # Too many to keep: check the disk from now on
+        if self.max_names is not None:
+            self._pending.setdefault(target_folder_name, set()).add(self._key(candidate))
+        return candidate
+
+    def release(self, target_folder_name, name):
+        """Tells the index that a name claimed with max_names set is on disk now (or never will be)."""
+        pending = self._pending.get(target_folder_name)
+        if pending is not None:
+            pending.discard(self._key(name))
+
+
+class StatCache:
+    """SQLite table of per-file values keyed by (device, inode); a row is valid while size and mtime match.
+
+    Subclasses name the table and its TEXT value columns in TABLE and COLUMNS.
+    With db_file None the cache only lives in memory (used by --dry-run).
+    """
+
+    TABLE = None
+    COLUMNS = ()
+
+    def __init__(self, db_file):
+        self.conn = sqlite3.connect(":memory:" if db_file is None else str(db_file))
+        columns = "".join(f"{column} TEXT, " for column in self.COLUMNS)
+        self.conn.execute(f"""CREATE TABLE IF NOT EXISTS {self.TABLE} (
+            dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER,
+            {columns}PRIMARY KEY (dev, ino))""")
+
+    def _get(self, st):
+        """Returns the tuple of COLUMNS stored for a stat result, or None if missing or stale."""
+        row = self.conn.execute(f"SELECT size, mtime_ns, {', '.join(self.COLUMNS)} FROM {self.TABLE} "
+                                "WHERE dev = ? AND ino = ?", (st.st_dev, st.st_ino)).fetchone()
+        if row is None or row[0] != st.st_size or row[1] != st.st_mtime_ns:
+            return None
+        return row[2:]
+
+    def _put(self, st, *values):
+        placeholders = ", ".join("?" * (4 + len(values)))
+        self.conn.execute(f"INSERT OR REPLACE INTO {self.TABLE}(dev, ino, size, mtime_ns, {', '.join(self.COLUMNS)}) "
+                          f"VALUES ({placeholders})", (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, *values))
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+class SniffCache(StatCache):
+    """Cache of content-sniffing results (see StatCache)."""
+
+    TABLE = "sniffs"
+    COLUMNS = ("folder",)
+
+    def get(self, st):
+        """Returns the cached folder for a stat result ("" if unrecognized), or None if not cached."""
+        row = self._get(st)
+        return None if row is None else row[0]
+
+    def put(self, st, folder):
+        self._put(st, folder or "")
+
+
+def _zip_category(data):
+    for marker, folder in ZIP_MEMBER_FOLDERS:
+        if marker in data:
+            return folder
+    return None
+
+
+def sniff_category(head):
+    """Identifies a file from its first bytes; returns a folder name or None."""
+    for offset, magic, folder in MAGIC_SIGNATURES:
+        if head.startswith(magic, offset):
+            return folder
+    if head.startswith(b"RIFF"):
+        return {b"WAVE": "Audio", b"AVI ": "Video", b"WEBP": "Images"}.get(head[8:12])
+    if head[4:8] == b"ftyp": # MP4 family: the brand tells audio, images and video apart
+        brand = head[8:12]
+        if brand in (b"M4A ", b"M4B "):
+            return "Audio"
+        if brand in (b"heic", b"heix", b"mif1", b"avif"):
+            return "Images"
+        return "Video"
+    if head.startswith(b"PK\x03\x04"):
+        return _zip_category(head) or "Archives"
+    text = head.lstrip().lower()
+    if text.startswith((b"<!doctype html", b"<html")):
+        return "Web"
+    if text.startswith(b"<svg") or (text.startswith(b"<?xml") and b"<svg" in text):
+        return "Images"
+    return None
+
+
+def sniff_file(path):
+    """Worker task: reads the start of a file and returns (read_ok, folder or None)."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(SNIFF_BYTES)
+            if head.startswith(b"PK\x03\x04") and b"[Content_Types].xml" in head and _zip_category(head) is None:
+                # Office Open XML: the part names are listed in the central directory at the end
+                f.seek(max(0, os.fstat(f.fileno()).st_size - ZIP_TAIL_BYTES))
+                return True, _zip_category(f.read(ZIP_TAIL_BYTES)) or "Documents"
+    except OSError:
+        return False, None
+    return True, sniff_category(head)
+
+
+def categorize(files, sniff_cache=None):
+    """Returns the category folder for each (path, stat_result) in files.
+
+    The extension mapping decides whenever it knows the extension. Other files
+    are identified from their first bytes when a sniff_cache is given: cached
+    results are used as long as size and mtime match, the rest are read on a
+    thread pool, SNIFF_BATCH files at a time. Unrecognized files go to
+    OTHER_FOLDER_NAME.
+    """
+    folders = []
+    to_read = [] # (index, path, stat) of files not in the cache
+    for index, (path, st) in enumerate(files):
+        folder = FILE_TYPE_MAPPINGS.get(pathlib.PurePath(path).suffix.lower())
+        if folder is None and sniff_cache is not None:
+            if st.st_ino == 0:
+                try:
+                    st = os.stat(path) # DirEntry.stat() on Windows leaves the inode out
+                except OSError:
+                    st = None
+            if st is not None:
+                folder = sniff_cache.get(st)
+                if folder is None:
+                    to_read.append((index, path, st))
+        folders.append(folder or OTHER_FOLDER_NAME)
+
+    if to_read:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            for start in range(0, len(to_read), SNIFF_BATCH):
+                batch = to_read[start:start + SNIFF_BATCH]
+                for (index, _, st), (read_ok, folder) in zip(batch, pool.map(sniff_file, [b[1] for b in batch])):
+                    if read_ok:
+                        sniff_cache.put(st, folder)
+                    folders[index] = folder or OTHER_FOLDER_NAME
+    return folders
+
+
+def plan_moves(dest_index=None, on_conflict=ON_CONFLICT, sniff_cache=None):
+    """Scans SOURCE_DIR once and decides where every file goes, without moving anything.
+
+    Files are categorized by categorize() (by content too if sniff_cache is
+    given). Name conflicts are resolved in memory through dest_index (renamed
+    or skipped according to on_conflict). Returns (moves, skipped) where moves
+    is a list of (original_path, new_path, target_folder_name, size_bytes) tuples.
+    """
+    if dest_index is None:
+        dest_index = DestinationIndex(DEST_DIR)
+    files = []
+    skipped = 0
+    with profile_phase("scan"), os.scandir(SOURCE_DIR) as it:
+        for entry in it:
+            try:
+                if not entry.is_file():
+                    continue # Directories are left alone, like in organize_files()
+                st = entry.stat()
+            except OSError as e:
+                print(f"Skipping '{entry.name}': {e}")
+                skipped += 1
+                continue
+            files.append((pathlib.Path(entry.path), st))
+
+    moves, conflicts = plan_files(files, dest_index, on_conflict, sniff_cache)
+    return moves, skipped + conflicts
+
+
+def plan_files(files, dest_index, on_conflict=ON_CONFLICT, sniff_cache=None):
+    """Decides where each (path, stat_result) in files goes; returns (moves, skipped) like plan_moves()."""
+    moves = []
+    skipped = 0
+    with profile_phase("categorize"):
+        folders = categorize(files, sniff_cache)
+    with profile_phase("plan"):
+        for (original_path, st), target_folder_name in zip(files, folders):
+            # Avoid overwriting: the index knows every name already in (or planned for) the folder
+            new_name = dest_index.claim(target_folder_name, original_path.name, on_conflict)
+            if new_name is None:
+                print(f"Skipping '{original_path.name}': File already exists in '{target_folder_name}'.")
+                skipped += 1
+                continue
+
+            moves.append((original_path, DEST_DIR / target_folder_name / new_name, target_folder_name, st.st_size))
+    return moves, skipped
+
+
+def print_plan(moves, skipped_count):
+    """Prints what a run would do (used by --dry-run); touches nothing on disk."""
+    per_folder = {}
+    total_bytes = 0
+    for original_path, new_path, target_folder_name, size in moves:
+        renamed = "" if new_path.name == original_path.name else f" (renamed to '{new_path.name}')"
+        print(f"Would move '{original_path}' -> '{target_folder_name}/'{renamed}")
+        per_folder[target_folder_name] = per_folder.get(target_folder_name, 0) + 1
+        total_bytes += size
+    print("-" * 30)
+    print("Dry run: nothing was moved.")
+    for target_folder_name in sorted(per_folder):
+        print(f"  {target_folder_name}: {per_folder[target_folder_name]} files")
+    print(f"Files to move: {len(moves)} ({total_bytes / 1048576:.1f} MB)")
+    print(f"Files to skip: {skipped_count}")
+
+
+class CopyProgress:
+    """Thread-safe byte counter that prints overall and per-file progress, throttled."""
+
+    def __init__(self, total_bytes=None):
+        self.total_bytes = total_bytes # None when the total is not known up front
+        self.done_bytes = 0
+        self._lock = threading.Lock()
+        self._last_print = time.monotonic()
+        self._file_last_print = {}
+
+    def add(self, byte_count, name=None, file_done=0, file_size=0):
+        """Records byte_count finished bytes; name/file_done/file_size describe a large copy in progress."""
+        with self._lock:
+            self.done_bytes += byte_count
+            now = time.monotonic()
+            if name is not None and file_size >= LARGE_FILE_BYTES:
+                if now - self._file_last_print.get(name, 0) >= PROGRESS_SECONDS or file_done == file_size:
+                    self._file_last_print[name] = now
+                    print(f"  Copying '{name}': {file_done * 100 // max(file_size, 1)}% "
+                          f"({file_done / 1048576:.0f} of {file_size / 1048576:.0f} MB)")
+                    if file_done == file_size:
+                        del self._file_last_print[name]
+            if now - self._last_print >= PROGRESS_SECONDS:
+                self._last_print = now
+                if self.total_bytes:
+                    print(f"Progress: {self.done_bytes / 1048576:.1f} of {self.total_bytes / 1048576:.1f} MB "
+                          f"({self.done_bytes * 100 // self.total_bytes}%)")
+                else:
+                    print(f"Progress: {self.done_bytes / 1048576:.1f} MB")
+
+
+_dest_devices = {} # Destination folder -> st_dev, so each category folder is stat'ed once
+
+
+def _device_of(folder):
+    device = _dest_devices.get(folder)
+    if device is None:
+        device = os.stat(folder).st_dev
+        _dest_devices[folder] = device
+    return device
+
+
+def _copy_data(src_fd, dst_fd, size, on_chunk):
+    """Copies size bytes between two open files, letting the kernel move the data where possible.
+
+    Tries os.copy_file_range, then os.sendfile, then plain buffered reads/writes,
+    falling back whenever the kernel or filesystem does not support a method.
+    Only the kernel-side calls use COPY_CHUNK_BYTES; reads/writes go through
+    one reused buffer of COPY_BUFFER_BYTES.
+    """
+    methods = []
+    if hasattr(os, "copy_file_range"):
+        methods.append("copy_file_range")
+    if hasattr(os, "sendfile"):
+        methods.append("sendfile")
+    methods.append("readwrite")
+
+    buffer = None
+    offset = 0
+    while offset < size:
+        method = methods[0]
+        count = min(COPY_CHUNK_BYTES if method != "readwrite" else COPY_BUFFER_BYTES, size - offset)
+        try:
+            if method == "copy_file_range":
+                copied = os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+            elif method == "sendfile":
+                os.lseek(dst_fd, offset, os.SEEK_SET)
+                copied = os.sendfile(dst_fd, src_fd, offset, count)
+            else:
+                os.lseek(src_fd, offset, os.SEEK_SET)
+                os.lseek(dst_fd, offset, os.SEEK_SET)
+                if hasattr(os, "readv"): # Read into the same buffer every time
+                    if buffer is None:
+                        buffer = memoryview(bytearray(COPY_BUFFER_BYTES))
+                    copied = os.readv(src_fd, [buffer[:count]])
+                    view = buffer[:copied]
+                else: # Windows
+                    view = memoryview(os.read(src_fd, count))
+                    copied = len(view)
+                while view:
+                    written = os.write(dst_fd, view)
+                    view = view[written:]
+        except OSError as e:
+            if method != "readwrite" and e.errno in (errno.EXDEV, errno.ENOSYS, errno.EINVAL,
+                                                     errno.EOPNOTSUPP, errno.ENOTSOCK, errno.EBADF):
+                methods.pop(0) # Not supported here, try the next method from the same offset
+                continue
+            raise
+        if copied == 0:
+            break # Source shrank while copying; the size check below reports it
+        offset += copied
+        on_chunk(copied, offset)
+
+
+def move_file(original_path, new_path, progress=None):
+    """Moves one file, using an atomic rename on the same filesystem.
+
+    Across filesystems the data is copied in large kernel-side chunks into a
+    temporary file next to new_path, the size is verified, the temporary file is
+    renamed into place, and only then is the source deleted. On any error the
+    source is left untouched and the partial copy removed.
+    """
+    import shutil # Only symlinks and cross-device copies need it; kept out of the start-up of every run
+    src_st = os.lstat(original_path)
+    size = src_st.st_size
+    if stat.S_ISLNK(src_st.st_mode):
+        shutil.move(str(original_path), str(new_path)) # Move the link itself, not its target
+    elif src_st.st_dev == _device_of(str(new_path.parent)):
+        os.rename(original_path, new_path)
+    else:
+        temp_path = new_path.with_name(f".{new_path.name}.part")
+        reported = 0
+
+        def on_chunk(copied, done):
+            nonlocal reported
+            reported = done
+            if progress is not None:
+                progress.add(copied, original_path.name, done, size)
+
+        try:
+            with open(original_path, 'rb') as src, open(temp_path, 'wb') as dst:
+                _copy_data(src.fileno(), dst.fileno(), size, on_chunk)
+                copied_size = os.fstat(dst.fileno()).st_size
+            if copied_size != size:
+                raise OSError(f"copy incomplete: {copied_size} of {size} bytes written")
+            shutil.copystat(original_path, temp_path) # Keep timestamps and permissions
+            os.replace(temp_path, new_path)
+        except BaseException:
+            if progress is not None and reported:
+                progress.add(-reported) # Failed copy does not count as progress
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+        os.unlink(original_path)
+        return
+    if progress is not None:
+        progress.add(size)
+
+
+def _move_one(original_path, new_path, progress=None):
+    """Worker task: moves a single file. Returns None on success or the error."""
+    try:
+        move_file(original_path, new_path, progress)
+        return None
+    except Exception as e: # Reported by the caller, the run carries on
+        return e
+
+
+class HashCache(StatCache):
+    """Cache of file hashes (see StatCache)."""
+
+    TABLE = "hashes"
+    COLUMNS = ("edge", "full")
+
+    def get(self, st):
+        """Returns (edge_hash, full_hash) for a stat result; either may be None."""
+        return self._get(st) or (None, None)
+
+    def put(self, st, edge=None, full=None):
+        """Stores either hash, keeping the other one if the file is unchanged."""
+        if edge is None or full is None:
+            cached_edge, cached_full = self.get(st)
+            edge = cached_edge if edge is None else edge
+            full = cached_full if full is None else full
+        self._put(st, edge, full)
+
+
+def _edge_hash(path, size):
+    """Hash of the first and last HASH_EDGE_BYTES of a file (the whole file if it is small)."""
+    import hashlib # Only needed with --dedupe
+    with open(path, 'rb') as f:
+        digest = hashlib.blake2b(f.read(HASH_EDGE_BYTES))
+        if size > HASH_EDGE_BYTES:
+            f.seek(max(HASH_EDGE_BYTES, size - HASH_EDGE_BYTES))
+            digest.update(f.read(HASH_EDGE_BYTES))
+    return digest.hexdigest()
+
+
+def _full_hash(path):
+    """Hash of the whole file, read through mmap (process pool task).
+
+    Returns (path, None) if the file vanished or became unreadable since it was edge-hashed.
+    """
+    import hashlib
+    digest = hashlib.blake2b()
+    try:
+        with open(path, 'rb') as f:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    view = memoryview(mapped)
+                    for offset in range(0, len(mapped), COPY_CHUNK_BYTES):
+                        digest.update(view[offset:offset + COPY_CHUNK_BYTES])
+                    view.release()
+            except ValueError: # Empty file cannot be mapped
+                pass
+    except OSError as e:
+        print(f"Cannot hash '{path}': {e}")
+        return str(path), None
+    return str(path), digest.hexdigest()
+
+
+def _full_hashes(paths):
+    """Returns {path: full_hash}, hashing on a process pool (threads if processes are unavailable).
+
+    The hash is None for files that could not be read.
+    """
+    if not paths:
+        return {}
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor # Loads multiprocessing, only needed with --dedupe
+    from concurrent.futures.process import BrokenProcessPool
+    from pickle import PicklingError
+    try:
+        with ProcessPoolExecutor(max_workers=HASH_WORKERS) as pool:
+            return dict(pool.map(_full_hash, paths, chunksize=16))
+    # Only failures of the pool itself, e.g. no working multiprocessing on this platform;
+    # unreadable files are handled by _full_hash
+    except (BrokenProcessPool, PicklingError, NotImplementedError, ImportError, OSError):
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool: # hashlib releases the GIL on big buffers
+            return dict(pool.map(_full_hash, paths))
+
+
+def find_duplicates(candidates, cache):
+    """Groups candidate files with identical content.
+
+    candidates is a list of (path, size) tuples. Files are grouped by size
+    first, then by a hash of their edges, and only files still colliding get a
+    full-content hash. Returns a list of groups, each a list of paths (2 or more).
+    Empty files are ignored.
+    """
+    by_size = {}
+    for path, size in candidates:
+        if size > 0:
+            by_size.setdefault(size, []).append(path)
+
+    # Stage 2: edge hashes, only for sizes shared by several files
+    by_edge = {}
+    stats = {}
+    for size, paths in by_size.items():
+        if len(paths) < 2:
+            continue
+        for path in paths:
+            try:
+                st = os.stat(path)
+                edge, full = cache.get(st)
+                if edge is None:
+                    edge = _edge_hash(path, size)
+                    cache.put(st, edge=edge)
+            except OSError as e:
+                print(f"Cannot hash '{path}': {e}")
+                continue
+            stats[str(path)] = (st, full)
+            by_edge.setdefault((size, edge), []).append(path)
+
+    # Stage 3: full hashes for edge collisions; small files were hashed completely already
+    by_full = {}
+    to_hash = []
+    for (size, edge), paths in by_edge.items():
+        if len(paths) < 2:
+            continue
+        for path in paths:
+            st, full = stats[str(path)]
+            if size <= 2 * HASH_EDGE_BYTES:
+                full = edge # The edge hash covered the whole file
+            if full is None:
+                to_hash.append(str(path))
+            else:
+                by_full.setdefault((size, full), []).append(path)
+
+    for path_text, full in _full_hashes(to_hash).items():
+        if full is None:
+            continue # Vanished or unreadable, reported by _full_hash
+        st, _ = stats[path_text]
+        cache.put(st, full=full)
+        by_full.setdefault((st.st_size, full), []).append(pathlib.Path(path_text))
+
+    return [paths for paths in by_full.values() if len(paths) > 1]
+
+
+def dedupe_moves(moves, mode):
+    """Finds planned moves whose content duplicates another file (planned or already in DEST_DIR).
+
+    Writes DUPLICATES_REPORT_NAME and returns (moves, links, skipped_count):
+    with mode "skip" duplicates are dropped from moves; with "hardlink" they are
+    returned in links as (move, existing_or_original_new_path) to be linked
+    after the originals are in place; with "report" moves are unchanged.
+    """
+    print("Looking for duplicate files...")
+    # Files already organized are candidates too; they are preferred as the copy to keep
+    existing = []
+    for target_folder_name in {move[2] for move in moves}:
+        folder = DEST_DIR / target_folder_name
+        if folder.is_dir():
+            with os.scandir(folder) as it:
+                for entry in it:
+                    if entry.is_file(follow_symlinks=False) and not entry.name.startswith('.'):
+                        existing.append((pathlib.Path(entry.path), entry.stat(follow_symlinks=False).st_size))
+
+    cache = HashCache(DEST_DIR / HASH_CACHE_NAME)
+    try:
+        groups = find_duplicates(existing + [(move[0], move[3]) for move in moves], cache)
+    finally:
+        cache.close()
+
+    moves_by_source = {move[0]: move for move in moves}
+    duplicate_moves = {} # source path -> path of the copy that is kept (at its destination)
+    report_rows = []
+    for group_id, paths in enumerate(groups, start=1):
+        # Keep an already organized file if there is one, otherwise the first planned source
+        paths.sort(key=lambda p: (p in moves_by_source, str(p)))
+        keep = paths[0]
+        keep_at = moves_by_source[keep][1] if keep in moves_by_source else keep
+        report_rows.append([group_id, str(keep), "kept", str(keep_at)])
+        for path in paths[1:]:
+            if path in moves_by_source:
+                duplicate_moves[path] = keep_at
+                report_rows.append([group_id, str(path), "duplicate", str(keep_at)])
+
+    report_file = DEST_DIR / DUPLICATES_REPORT_NAME
+    with open(report_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Group", "Path", "Role", "Kept Copy"])
+        writer.writerows(report_rows)
+    print(f"Found {len(duplicate_moves)} duplicate files in {len(groups)} groups. Report: {report_file}")
+
+    if mode == "report" or not duplicate_moves:
+        return moves, [], 0
+    remaining = [move for move in moves if move[0] not in duplicate_moves]
+    if mode == "skip":
+        return remaining, [], len(duplicate_moves)
+    links = [(moves_by_source[path], keep_at) for path, keep_at in duplicate_moves.items()]
+    return remaining, links, 0
+
+
+def link_duplicate(move, keep_at):
+    """Replaces a duplicate by a hard link to the kept copy at its planned destination.
+
+    Falls back to a normal move if linking is not possible (different filesystem, kept copy missing).
+    """
+    original_path, new_path, _, _ = move
+    try:
+        os.link(keep_at, new_path)
+    except OSError:
+        move_file(original_path, new_path)
+        return False
+    os.unlink(original_path)
+    return True
+
+
+def run_moves(moves, pool, log_writer, progress=None, on_result=None):
+    """Runs planned moves on pool and logs the successful ones.
+
+    on_result(move, error) is called on this thread as each move finishes
+    (error is None on success). Returns (moved_count, moved_bytes, error_count).
+    """
+    from concurrent.futures import as_completed
+    moved_count = 0
+    moved_bytes = 0
+    error_count = 0
+    with profile_phase("move"):
+        futures = {pool.submit(_move_one, move[0], move[1], progress): move for move in moves}
+        for future in as_completed(futures):
+            original_path, new_path, target_folder_name, size = futures[future]
+            error = future.result()
+            if on_result is not None:
+                on_result(futures[future], error)
+            if error is None:
+                log_writer.log(original_path, new_path, target_folder_name)
+                moved_count += 1
+                moved_bytes += size
+                if moved_count % PROGRESS_EVERY == 0:
+                    print(f"... {moved_count}/{len(moves)} files moved")
+            else:
+                print(f"Error moving '{original_path.name}': {error}")
+                error_count += 1
+    return moved_count, moved_bytes, error_count
+
+
+def organize_files_pipeline(workers=MAX_WORKERS, dedupe=None, on_conflict=ON_CONFLICT, dry_run=False,
+                            sniff=SNIFF_CONTENT):
+    """Like organize_files(), but plans first, then moves on a thread pool with one buffered log writer.
+
+    dedupe can be "report", "skip" or "hardlink" to run the duplicate detection stage first.
+    With sniff, files with unknown extensions are categorized by their content.
+    With dry_run the plan is printed and nothing is moved.
+    """
     print(f"Scanning source directory: {SOURCE_DIR}")
     print(f"Organizing into destination: {DEST_DIR}")
+    print(f"Pipeline mode: {workers} workers")
+    print("-" * 30)
+
+    if not SOURCE_DIR.is_dir():
+        print(f"Error: Source directory '{SOURCE_DIR}' not found or is not a directory.")
+        return
+
+    start = time.perf_counter()
+    sniff_cache = SniffCache(None if dry_run else DEST_DIR / SNIFF_CACHE_NAME) if sniff else None
+    try:
+        moves, skipped_count = plan_moves(on_conflict=on_conflict, sniff_cache=sniff_cache)
+    finally:
+        if sniff_cache is not None:
+            sniff_cache.close()
+    if dry_run:
+        print_plan(moves, skipped_count)
+        return
+    from concurrent.futures import ThreadPoolExecutor
+    links = []
+    if dedupe:
+        with profile_phase("dedupe"):
+            moves, links, duplicate_count = dedupe_moves(moves, dedupe)
+        skipped_count += duplicate_count
+
+    # Create each category directory once instead of once per file (hard-linked duplicates need theirs too)
+    for target_folder_name in {move[2] for move in moves} | {move[2] for move, _ in links}:
+        (DEST_DIR / target_folder_name).mkdir(parents=True, exist_ok=True)
+
+    progress = CopyProgress(total_bytes=sum(move[3] for move in moves))
+    run_log = RunLog(DEST_DIR / RUN_LOG_NAME, "pipeline")
+    with BufferedLogWriter(LOG_FILE, run_log=run_log) as log_writer, ThreadPoolExecutor(max_workers=workers) as pool:
+        moved_count, moved_bytes, error_count = run_moves(moves, pool, log_writer, progress)
+        skipped_count += error_count
+
+        # Duplicates go last, once the copy they link to is in place
+        linked_count = 0
+        for move, keep_at in links:
+            original_path, new_path, target_folder_name, size = move
+            try:
+                if link_duplicate(move, keep_at):
+                    linked_count += 1
+                    log_writer.log(original_path, new_path, f"{target_folder_name} (hard link)")
+                else:
+                    log_writer.log(original_path, new_path, target_folder_name)
+                    moved_bytes += size
+                moved_count += 1
+            except OSError as e:
+                print(f"Error moving '{original_path.name}': {e}")
+                skipped_count += 1
+        if links:
+            print(f"Duplicates replaced by hard links: {linked_count}")
+
+    elapsed = time.perf_counter() - start
+    print("-" * 30)
+    print("Organization complete.")
+    print(f"Files moved: {moved_count}")
+    print(f"Files skipped: {skipped_count}")
+    print_throughput(moved_count, moved_bytes, elapsed)
+    if moved_count > 0:
+        print(f"Details logged in: {LOG_FILE}")
+
+
+def print_throughput(file_count, byte_count, elapsed):
+    """Prints files/s and MB/s for a finished run."""
+    if PROFILE is not None:
+        PROFILE.note(files=file_count, bytes=byte_count)
+    elapsed = max(elapsed, 1e-9)
+    print(f"Elapsed: {elapsed:.2f} s, "
+          f"{file_count / elapsed:.1f} files/s, "
+          f"{byte_count / (1024 * 1024) / elapsed:.2f} MB/s")
+
+class _DirProgress:
+    """Bookkeeping for one source directory during a recursive run.
+
+    pending counts unfinished moves, unfinished child directories, and 1 for the
+    scan of the directory itself. When it drops to 0 the whole tree is done.
+    """
+    __slots__ = ("path", "parent", "pending")
+
+    def __init__(self, path, parent):
+        self.path = path
+        self.parent = parent
+        self.pending = 1
+
+
+def iter_source_tree(root, done_trees):
+    """Walks root depth-first, yielding ("file", dir_progress, entry) and ("scanned", dir_progress).
+
+    Never builds the full file list: one directory is read at a time, lazily.
+    Trees listed in done_trees (from the journal) and symlinked directories are skipped.
+    """
+    stack = [_DirProgress(str(root), None)]
+    while stack:
+        node = stack.pop()
+        if node.path in done_trees:
+            node.pending = 0
+            yield ("scanned", node) # Finished by an earlier run
+            continue
+        try:
+            with os.scandir(node.path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            node.pending += 1
+                            stack.append(_DirProgress(entry.path, node))
+                        elif entry.is_file(follow_symlinks=False):
+                            yield ("file", node, entry)
+                    except OSError as e:
+                        print(f"Skipping '{entry.path}': {e}")
+        except OSError as e:
+            print(f"Cannot read directory '{node.path}': {e}")
+        node.pending -= 1
+        yield ("scanned", node)
+
+
+def load_journal(journal_file):
+    """Returns the set of source trees an earlier, interrupted run already finished."""
+    done_trees = set()
+    if journal_file.exists():
+        with open(journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                kind, _, path = line.rstrip('\n').partition('\t')
+                if kind == "TREE_DONE":
+                    done_trees.add(path)
+    return done_trees
+
+
+def organize_files_recursive(workers=MAX_WORKERS, on_conflict=ON_CONFLICT, dry_run=False, sniff=SNIFF_CONTENT):
+    """Organizes every file below SOURCE_DIR, streaming the walk through a bounded move queue.
+
+    Finished directory trees are appended to a journal in DEST_DIR; if the run is
+    killed, the next run skips those trees and carries on with the rest. Files
+    already moved are gone from the source, so partly done directories simply
+    continue where they stopped. The journal is removed after a complete run.
+    With sniff, files with unknown extensions are categorized by their content,
+    a batch at a time. With dry_run the plan is printed and nothing is moved or journaled.
+    """
+    print(f"Scanning source tree: {SOURCE_DIR}")
+    print(f"Organizing into destination: {DEST_DIR}")
+    print(f"Recursive mode: {workers} workers")
     print("-" * 30)
 
     if not SOURCE_DIR.is_dir():
         print(f"Error: Source directory '{SOURCE_DIR}' not found or is not a directory.")
         return
 
+    if dry_run:
+        dest_index = DestinationIndex(DEST_DIR) # Nothing reaches the disk, so every name stays in memory
+        files = []
+        with profile_phase("scan"):
+            for event in iter_source_tree(SOURCE_DIR, set()):
+                if event[0] == "file":
+                    try:
+                        files.append((pathlib.Path(event[2].path), event[2].stat(follow_symlinks=False)))
+                    except OSError:
+                        continue # Vanished while walking
+        moves, skipped_count = plan_files(files, dest_index, on_conflict, SniffCache(None) if sniff else None)
+        print_plan(moves, skipped_count)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    dest_index = DestinationIndex(DEST_DIR, DEST_INDEX_MAX_NAMES)
+    journal_file = DEST_DIR / JOURNAL_NAME
+    done_trees = load_journal(journal_file)
+    if done_trees:
+        print(f"Resuming: {len(done_trees)} directories were finished by an earlier run.")
+
+    start = time.perf_counter()
     moved_count = 0
     skipped_count = 0
+    moved_bytes = 0
+    progress = CopyProgress() # Total unknown: the tree is never listed up front
+    created_dirs = set() # Category folders already created in this run
+    in_flight = {} # future -> (dir_progress, original_path, new_path, target_folder_name, size)
+    to_sniff = [] # (dir_progress, original_path, stat) of files waiting for a content check
 
-    for item in SOURCE_DIR.iterdir():
-        if item.is_file():
-            original_path = item
-            file_extension = original_path.suffix.lower() # Get extension like '.txt'
+    def tree_finished(node):
+        # Journal the finished tree, then propagate up to the parents it completes.
+        # Its moves are flushed to the log first: a resumed run skips a TREE_DONE tree,
+        # so moves still buffered at a crash would be missing from the log for good.
+        if node.pending == 0:
+            log_writer.flush()
+        while node is not None and node.pending == 0:
+            journal.write(f"TREE_DONE\t{node.path}\n")
+            journal.flush()
+            node = node.parent
+            if node is not None:
+                node.pending -= 1
 
-            # Determine target folder name
-            target_folder_name = FILE_TYPE_MAPPINGS.get(file_extension, OTHER_FOLDER_NAME)
-            target_subdir = DEST_DIR / target_folder_name
+    def collect(done):
+        nonlocal moved_count, skipped_count, moved_bytes
+        for future in done:
+            node, original_path, new_path, target_folder_name, size = in_flight.pop(future)
+            error = future.result()
+            dest_index.release(target_folder_name, new_path.name)
+            if error is None:
+                log_writer.log(original_path, new_path, target_folder_name)
+                moved_count += 1
+                moved_bytes += size
+                if moved_count % PROGRESS_EVERY == 0:
+                    print(f"... {moved_count} files moved")
+            else:
+                print(f"Error moving '{original_path}': {error}")
+                skipped_count += 1
+            node.pending -= 1
+            tree_finished(node)
 
-            # Create target subdirectory if it doesn't exist
+    def submit(node, original_path, st, target_folder_name):
+        # node.pending already counts this file
+        nonlocal skipped_count
+        # Names are claimed in memory, so two sources never race for one destination
+        new_name = dest_index.claim(target_folder_name, original_path.name, on_conflict)
+        if new_name is None:
+            print(f"Skipping '{original_path}': File already exists in '{target_folder_name}'.")
+            skipped_count += 1
+            node.pending -= 1
+            tree_finished(node)
+            return
+        target_subdir = DEST_DIR / target_folder_name
+        if target_folder_name not in created_dirs:
             target_subdir.mkdir(parents=True, exist_ok=True)
+            created_dirs.add(target_folder_name)
 
-            # Construct the full destination path
-            new_path = target_subdir / original_path.name
+        future = pool.submit(_move_one, original_path, target_subdir / new_name, progress)
+        in_flight[future] = (node, original_path, target_subdir / new_name, target_folder_name, st.st_size)
 
-            # Avoid overwriting: Check if file already exists in destination
-            if new_path.exists():
-                print(f"Skipping '{original_path.name}': File already exists in '{target_folder_name}'.")
-                skipped_count += 1
+        # Bounded queue: wait for some moves to finish before reading further
+        if len(in_flight) >= MAX_IN_FLIGHT:
+            with profile_phase("move"): # Time the walk spends waiting for the movers
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+
+    def sniff_batch():
+        batch = list(to_sniff)
+        to_sniff.clear()
+        with profile_phase("categorize"):
+            folders = categorize([(original_path, st) for _, original_path, st in batch], sniff_cache)
+        for (node, original_path, st), target_folder_name in zip(batch, folders):
+            submit(node, original_path, st, target_folder_name)
+
+    sniff_cache = SniffCache(DEST_DIR / SNIFF_CACHE_NAME) if sniff else None
+    with open(journal_file, 'a', encoding='utf-8') as journal, \
+            BufferedLogWriter(LOG_FILE, run_log=RunLog(DEST_DIR / RUN_LOG_NAME, "recursive")) as log_writer, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        for event in iter_source_tree(SOURCE_DIR, done_trees):
+            if event[0] == "scanned":
+                tree_finished(event[1])
                 continue
 
-            # Move the file
+            _, node, entry = event
+            original_path = pathlib.Path(entry.path)
             try:
-                shutil.move(str(original_path), str(new_path))
-                print(f"Moved '{original_path.name}' -> '{target_folder_name}/'")
-                # Log the action
-                log_action(original_path, new_path, target_folder_name)
-                moved_count += 1
+                st = entry.stat(follow_symlinks=False)
             except OSError as e:
-                print(f"Error moving '{original_path.name}': {e}")
+                print(f"Skipping '{original_path}': {e}")
                 skipped_count += 1
-            except Exception as e:
-                 print(f"An unexpected error occurred moving '{original_path.name}': {e}")
-                 skipped_count += 1
-        # else: # Optional: Handle directories found in the source directory
-        #     print(f"Skipping directory: {item.name}")
-        #     skipped_count += 1
+                continue
+
+            node.pending += 1
+            target_folder_name = FILE_TYPE_MAPPINGS.get(original_path.suffix.lower())
+            if target_folder_name is None and sniff_cache is not None:
+                # Unknown extension: identify it by content together with the next few files
+                to_sniff.append((node, original_path, st))
+                if len(to_sniff) >= SNIFF_BATCH:
+                    sniff_batch()
+                continue
+            submit(node, original_path, st, target_folder_name or OTHER_FOLDER_NAME)
+
+        sniff_batch()
+        with profile_phase("move"):
+            collect(list(in_flight))
+    if sniff_cache is not None:
+        sniff_cache.close()
+
+    journal_file.unlink(missing_ok=True) # Complete run: nothing left to resume
+
+    elapsed = time.perf_counter() - start
+    print("-" * 30)
+    print("Organization complete.")
+    print(f"Files moved: {moved_count}")
+    print(f"Files skipped: {skipped_count}")
+    print_throughput(moved_count, moved_bytes, elapsed)
+    if moved_count > 0:
+        print(f"Details logged in: {LOG_FILE}")
+
+
+# inotify constants (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+_INOTIFY_EVENT = struct.Struct("iIII") # wd, mask, cookie, name length
+
+
+def inotify_watch(folder):
+    """Returns a non-blocking inotify descriptor reporting new files in folder, or None if unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    import ctypes, ctypes.util # Only needed by --watch; kept out of the startup of every other run
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(folder), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) < 0:
+            os.close(fd)
+            return None
+    except (OSError, AttributeError):
+        return None # No usable libc (e.g. a musl build without find_library support)
+    return fd
+
+
+def read_inotify(fd):
+    """Drains pending inotify events; returns (names, rescan) where rescan means events were lost."""
+    names = set()
+    rescan = False
+    while True:
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return names, rescan
+        offset = 0
+        while offset < len(data):
+            _, mask, _, name_length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = data[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+            if mask & (IN_Q_OVERFLOW | IN_IGNORED):
+                rescan = True # Queue overflowed or the folder itself went away
+            elif name and not mask & IN_ISDIR:
+                names.add(os.fsdecode(name))
+
+
+def _watchable(name):
+    return not name.startswith('.') and not name.lower().endswith(WATCH_IGNORE_SUFFIXES)
+
+
+def _file_names(folder):
+    """Names of the regular files in folder that watch mode may move."""
+    names = set()
+    try:
+        with os.scandir(folder) as it:
+            for entry in it:
+                try:
+                    if entry.is_file(follow_symlinks=False) and _watchable(entry.name):
+                        names.add(entry.name)
+                except OSError:
+                    continue
+    except OSError as e:
+        print(f"Cannot read directory '{folder}': {e}")
+    return names
+
+
+def watch_source(workers=MAX_WORKERS, on_conflict=ON_CONFLICT, sniff=SNIFF_CONTENT, dry_run=False):
+    """Keeps organizing SOURCE_DIR as files appear, until interrupted with Ctrl+C.
+
+    New files are reported by inotify on Linux; elsewhere the folder's mtime is
+    polled every WATCH_POLL_SECONDS and the listing diffed against the last one.
+    A file is only moved once its size and mtime have been stable for
+    WATCH_SETTLE_SECONDS, so downloads in progress stay where they are. Files
+    that settle together are moved as one batch, categorized and planned like
+    in pipeline mode. While nothing is pending the loop sleeps in select() (or
+    between polls), so an idle watcher uses next to no CPU.
+    """
+    print(f"Watching source directory: {SOURCE_DIR}")
+    print(f"Organizing into destination: {DEST_DIR}")
+
+    if not SOURCE_DIR.is_dir():
+        print(f"Error: Source directory '{SOURCE_DIR}' not found or is not a directory.")
+        return
+
+    fd = inotify_watch(SOURCE_DIR)
+    print("Using inotify." if fd is not None else f"Polling every {WATCH_POLL_SECONDS:g} s.")
+    print("Press Ctrl+C to stop.")
+    print("-" * 30)
+
+    pending = {} # name -> (size, mtime_ns, monotonic time the file was last seen changing)
+    known = set() # Names already queued or handled (polling mode only)
+    dir_mtime = None
+    moved_total = 0
+    skipped_total = 0
+    sniff_cache = SniffCache(None if dry_run else DEST_DIR / SNIFF_CACHE_NAME) if sniff else None
+    from concurrent.futures import ThreadPoolExecutor
+    pool = ThreadPoolExecutor(max_workers=workers)
+    log_writer = None if dry_run else BufferedLogWriter(LOG_FILE, run_log=RunLog(DEST_DIR / RUN_LOG_NAME, "watch")).open()
+    try:
+        new_names = _file_names(SOURCE_DIR) # Files already waiting are organized too
+        while True:
+            now = time.monotonic()
+            for name in new_names:
+                if name not in pending and _watchable(name):
+                    pending[name] = (None, None, now)
+            if fd is None:
+                known |= new_names
+
+            # Files whose size and mtime stopped changing are ready to move
+            ready = []
+            for name, (size, mtime_ns, since) in list(pending.items()):
+                path = SOURCE_DIR / name
+                try:
+                    st = path.stat()
+                except OSError:
+                    del pending[name] # Gone again (moved away or deleted)
+                    continue
+                if not stat.S_ISREG(st.st_mode):
+                    del pending[name]
+                elif (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                    pending[name] = (st.st_size, st.st_mtime_ns, now)
+                elif now - since >= WATCH_SETTLE_SECONDS:
+                    del pending[name]
+                    ready.append((path, st))
+
+            if ready:
+                moves, skipped_count = plan_files(ready, DestinationIndex(DEST_DIR), on_conflict, sniff_cache)
+                if dry_run:
+                    print_plan(moves, skipped_count)
+                else:
+                    for target_folder_name in {move[2] for move in moves}:
+                        (DEST_DIR / target_folder_name).mkdir(parents=True, exist_ok=True)
+                    moved_count, _, error_count = run_moves(moves, pool, log_writer)
+                    log_writer.flush()
+                    if sniff_cache is not None:
+                        sniff_cache.commit()
+                    skipped_count += error_count
+                    moved_total += moved_count
+                    skipped_total += skipped_count
+                    print(f"{time.strftime('%H:%M:%S')} organized {moved_count} files ({skipped_count} skipped)")
+
+            # Sleep until something happens: new events, a poll, or a pending file to re-check
+            if fd is not None:
+                readable, _, _ = select.select([fd], [], [], WATCH_CHECK_SECONDS if pending else None)
+                new_names = set()
+                if readable:
+                    new_names, rescan = read_inotify(fd)
+                    if rescan:
+                        new_names = _file_names(SOURCE_DIR)
+            else:
+                time.sleep(WATCH_CHECK_SECONDS if pending else WATCH_POLL_SECONDS)
+                new_names = set()
+                try:
+                    current_mtime = SOURCE_DIR.stat().st_mtime_ns
+                except OSError:
+                    current_mtime = None
+                if current_mtime != dir_mtime:
+                    dir_mtime = current_mtime
+                    if current_mtime is not None and time.time_ns() - current_mtime < WATCH_POLL_SECONDS * 1e9:
+                        dir_mtime = None # Coarse timestamps: a file added right after this listing could share its mtime
+                    current = _file_names(SOURCE_DIR)
+                    new_names = current - known
+                    known = current # Forget names that left the folder so they count as new if they return
+    except KeyboardInterrupt:
+        print()
+    finally:
+        pool.shutdown(wait=True)
+        if log_writer is not None:
+            log_writer.close()
+        if sniff_cache is not None:
+            sniff_cache.close()
+        if fd is not None:
+            os.close(fd)
+
+    print("-" * 30)
+    print("Watch stopped.")
+    print(f"Files moved: {moved_total}")
+    print(f"Files skipped: {skipped_total}")
+
+def organize_files():
+    """Scans the source directory and moves files to the destination directory."""
+    print(f"Scanning source directory: {SOURCE_DIR}")
+    print(f"Organizing into destination: {DEST_DIR}")
+    print("-" * 30)
+
+    if not SOURCE_DIR.is_dir():
+        print(f"Error: Source directory '{SOURCE_DIR}' not found or is not a directory.")
+        return
+
+    moved_count = 0
+    skipped_count = 0
+    progress = CopyProgress()
+
+    # Rows are written in batches: a commit per file made the SQLite run log the slowest part of a run
+    with BufferedLogWriter(LOG_FILE, run_log=RunLog(DEST_DIR / RUN_LOG_NAME, "serial")) as log_writer:
+        for item in SOURCE_DIR.iterdir():
+            if item.is_file():
+                original_path = item
+                file_extension = original_path.suffix.lower() # Get extension like '.txt'
+
+                # Determine target folder name
+                target_folder_name = FILE_TYPE_MAPPINGS.get(file_extension, OTHER_FOLDER_NAME)
+                target_subdir = DEST_DIR / target_folder_name
+
+                # Create target subdirectory if it doesn't exist
+                target_subdir.mkdir(parents=True, exist_ok=True)
+
+                # Construct the full destination path
+                new_path = target_subdir / original_path.name
+
+                # Avoid overwriting: Check if file already exists in destination
+                if new_path.exists():
+                    print(f"Skipping '{original_path.name}': File already exists in '{target_folder_name}'.")
+                    skipped_count += 1
+                    continue
+
+                # Move the file
+                try:
+                    with profile_phase("move"):
+                        move_file(original_path, new_path, progress)
+                    print(f"Moved '{original_path.name}' -> '{target_folder_name}/'")
+                    # Log the action
+                    log_writer.log(original_path, new_path, target_folder_name)
+                    moved_count += 1
+                except OSError as e:
+                    print(f"Error moving '{original_path.name}': {e}")
+                    skipped_count += 1
+                except Exception as e:
+                     print(f"An unexpected error occurred moving '{original_path.name}': {e}")
+                     skipped_count += 1
+            # else: # Optional: Handle directories found in the source directory
+            #     print(f"Skipping directory: {item.name}")
+            #     skipped_count += 1
+    if PROFILE is not None:
+        PROFILE.note(files=moved_count, bytes=progress.done_bytes)
 
     print("-" * 30)
     print("Organization complete.")
@@ -158,19 +1607,197 @@ def organize_files():
     if moved_count > 0:
         print(f"Details logged in: {LOG_FILE}")
 
+
+def list_runs():
+    """Prints the runs recorded in the run log, oldest first."""
+    run_log_file = DEST_DIR / RUN_LOG_NAME
+    if not run_log_file.exists():
+        print(f"No run log found at {run_log_file}.")
+        return
+    conn = sqlite3.connect(str(run_log_file))
+    try:
+        rows = conn.execute(
+            "SELECT r.run_id, r.started, r.mode, COUNT(m.id), COALESCE(SUM(m.undone), 0) "
+            "FROM runs r LEFT JOIN moves m ON m.run_id = r.run_id GROUP BY r.run_id ORDER BY r.started, r.rowid").fetchall()
+    finally:
+        conn.close()
+    print(f"{'Run ID':<22} {'Started':<20} {'Mode':<10} {'Moves':>8} {'Undone':>8}")
+    for run_id, started, mode, move_count, undone_count in rows:
+        print(f"{run_id:<22} {started:<20} {mode:<10} {move_count:>8} {undone_count:>8}")
+
+
+def _restore_one(new_path, original_path):
+    """Worker task: moves one organized file back; returns None or the reason it was left alone."""
+    if not os.path.lexists(new_path):
+        return "no longer at its organized location"
+    if os.path.lexists(original_path):
+        return "something else is at the original location"
+    try:
+        original_path.parent.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        return str(e)
+    return _move_one(new_path, original_path)
+
+
+def undo_run(run_id, workers=MAX_WORKERS):
+    """Moves the files of one logged run back to where they came from.
+
+    Moves are read from the run log UNDO_BATCH at a time, newest first (a range
+    scan on the (run_id, id) index), and reversed on a thread pool. A file that
+    is no longer where the run put it, or whose original location is taken, is
+    a conflict: it is reported and left alone. Restored moves are marked as
+    undone, so running the same undo again only retries the conflicts.
+    """
+    run_log_file = DEST_DIR / RUN_LOG_NAME
+    if not run_log_file.exists():
+        print(f"Error: No run log found at {run_log_file}.")
+        return
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    conn = sqlite3.connect(str(run_log_file), timeout=30)
+    try:
+        run = conn.execute("SELECT started, mode FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if run is None:
+            print(f"Error: Run '{run_id}' is not in {run_log_file}. Use --list-runs to see the recorded runs.")
+            return
+        print(f"Undoing run {run_id} ({run[1]} mode, started {run[0]})")
+        print("-" * 30)
+
+        start = time.perf_counter()
+        restored_count = 0
+        conflict_count = 0
+        last_id = None
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                rows = conn.execute(
+                    "SELECT id, original_path, new_path FROM moves "
+                    "WHERE run_id = ? AND undone = 0 AND id < ? ORDER BY id DESC LIMIT ?",
+                    (run_id, last_id if last_id is not None else 2 ** 63 - 1, UNDO_BATCH)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                futures = {pool.submit(_restore_one, pathlib.Path(new_path), pathlib.Path(original_path)):
+                           (move_id, original_path) for move_id, original_path, new_path in rows}
+                restored_ids = []
+                for future in as_completed(futures):
+                    move_id, original_path = futures[future]
+                    reason = future.result()
+                    if reason is None:
+                        restored_ids.append((move_id,))
+                    else:
+                        print(f"Conflict: '{original_path}' {reason}.")
+                        conflict_count += 1
+                conn.executemany("UPDATE moves SET undone = 1 WHERE id = ?", restored_ids)
+                conn.commit()
+                restored_count += len(restored_ids)
+                if len(rows) == UNDO_BATCH: # More batches may follow
+                    print(f"... {restored_count} files restored")
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    print("-" * 30)
+    print("Undo complete.")
+    print(f"Files restored: {restored_count}")
+    print(f"Conflicts: {conflict_count}")
+    print_throughput(restored_count, 0, elapsed)
+
 # --- Main Execution ---
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sort the files in SOURCE_DIR into category folders in DEST_DIR.")
+    parser.add_argument("--source", type=pathlib.Path,
+                        help="folder to organize (default: SOURCE_DIR in the configuration section)")
+    parser.add_argument("--dest", type=pathlib.Path,
+                        help="folder to organize into; the log goes there too (default: DEST_DIR)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="plan all moves first, then move files on a thread pool with batched logging")
+    parser.add_argument("--recursive", action="store_true",
+                        help="also organize files in subfolders; resumes from the journal if a previous run was interrupted")
+    parser.add_argument("--dedupe", choices=["report", "skip", "hardlink"],
+                        help="find files with identical content (implies --pipeline; not with --recursive or --watch): "
+                             "only report them, skip moving duplicates, or replace duplicates with hard links")
+    parser.add_argument("--on-conflict", choices=["rename", "skip"], default=ON_CONFLICT,
+                        help=f"pipeline/recursive mode: what to do when the name is taken in the category folder "
+                             f"(default: {ON_CONFLICT})")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and organize new files in SOURCE_DIR as they appear (Ctrl+C to stop)")
+    parser.add_argument("--no-sniff", action="store_true",
+                        help="pipeline/recursive mode: categorize by extension only, never read file contents")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="with --pipeline, --recursive or --watch: print the full plan without moving anything")
+    parser.add_argument("--list-runs", action="store_true",
+                        help="list the runs recorded in the run log and exit")
+    parser.add_argument("--undo", metavar="RUN_ID",
+                        help="move the files of an earlier run back to where they came from")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help=f"number of parallel moves in pipeline/recursive mode (default: {MAX_WORKERS})")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"time each phase of the run (scan, categorize, plan, move, log), print the timings "
+                             f"and append them to {PROFILE_STATS_NAME} in DEST_DIR")
+    parser.add_argument("--cprofile", metavar="FILE", type=pathlib.Path,
+                        help="like --profile, and also save cProfile statistics of the main thread to FILE "
+                             "(read them with: python -m pstats FILE)")
+    args = parser.parse_args()
+    # The plan follows the pipeline rules (renames, sniffing), which the serial run does not use
+    if args.dry_run and args.dedupe:
+        parser.error("--dry-run cannot plan --dedupe (finding duplicates reads every file); leave one of them out")
+    if args.dedupe and (args.recursive or args.watch):
+        parser.error("--dedupe only works on the top-level folder; it cannot be combined with --recursive or --watch")
+    if args.dry_run and not (args.pipeline or args.recursive or args.watch):
+        parser.error("--dry-run needs --pipeline, --recursive or --watch")
+    if args.source is not None:
+        SOURCE_DIR = args.source
+    if args.dest is not None:
+        DEST_DIR = args.dest
+        LOG_FILE = DEST_DIR / LOG_FILE.name
+
     # Ensure paths are absolute for clarity, though pathlib handles relative paths too
     SOURCE_DIR = SOURCE_DIR.resolve()
     DEST_DIR = DEST_DIR.resolve()
     LOG_FILE = LOG_FILE.resolve() # Resolve log file path based on potentially resolved DEST_DIR
 
+    profiler = None
+    if (args.profile or args.cprofile) and not args.list_runs:
+        PROFILE = RunProfile()
+        if args.cprofile:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+    if args.list_runs:
+        list_runs()
+    elif args.undo:
+        undo_run(args.undo, workers=args.workers)
     # Basic check to prevent organizing the destination into itself if paths overlap carelessly
-    if SOURCE_DIR == DEST_DIR or DEST_DIR.is_relative_to(SOURCE_DIR):
+    elif SOURCE_DIR == DEST_DIR or DEST_DIR.is_relative_to(SOURCE_DIR):
          print(f"Error: Destination directory '{DEST_DIR}' cannot be the same as or inside the source directory '{SOURCE_DIR}'.")
+    elif args.dry_run:
+        if args.watch:
+            watch_source(on_conflict=args.on_conflict, sniff=not args.no_sniff, dry_run=True)
+        elif args.recursive:
+            organize_files_recursive(on_conflict=args.on_conflict, dry_run=True, sniff=not args.no_sniff)
+        else:
+            organize_files_pipeline(on_conflict=args.on_conflict, dry_run=True, sniff=not args.no_sniff)
     elif setup_logging():
-        organize_files()
+        if args.watch:
+            watch_source(workers=args.workers, on_conflict=args.on_conflict, sniff=not args.no_sniff)
+        elif args.recursive:
+            organize_files_recursive(workers=args.workers, on_conflict=args.on_conflict, sniff=not args.no_sniff)
+        elif args.pipeline or args.dedupe:
+            organize_files_pipeline(workers=args.workers, dedupe=args.dedupe, on_conflict=args.on_conflict,
+                                    sniff=not args.no_sniff)
+        else:
+            organize_files()
     else:
         print("Setup failed. Exiting.")
 
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.cprofile)
+        print(f"cProfile statistics saved to: {args.cprofile}")
+    if PROFILE is not None:
+        mode = ("undo" if args.undo else "watch" if args.watch else "recursive" if args.recursive
+                else "pipeline" if args.pipeline or args.dedupe or args.dry_run else "serial")
+        # A dry run writes nothing to DEST_DIR, the stats file included
+        PROFILE.report(mode, None if args.dry_run or not DEST_DIR.is_dir() else DEST_DIR / PROFILE_STATS_NAME)
+
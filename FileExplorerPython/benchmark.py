@@ -0,0 +1,354 @@
+"""Timing harness for the explorer engines, the organizer and the command-line tools.
+
+    python benchmark.py run [--scenarios flat,deep,mixed,large,startup] [--out FILE] [--compare OLD_FILE]
+    python benchmark.py startup [--runs N]
+
+run builds synthetic trees in a temporary directory and times the code
+behind the explorer and the organizer on them:
+
+    list_flat       one folder of FLAT_FILES files (1M by default): scan, sort, stat,
+                    re-sort by size and filter, the way the explorer lists it
+    navigate_deep   opening DEEP_LEVELS nested folders one after another, then going
+                    back through the listing cache like the Back button
+    organize_deep   recursive organize of that nested tree
+    organize_mixed  pipeline organize of MIXED_FILES files with known, unknown and
+                    missing extensions (the unknown ones are identified by content)
+    organize_large  pipeline organize of LARGE_FILES big files; a rename unless
+                    --dest-dir is on another filesystem, which makes it a copy
+
+Listing phases are timed with profiling.PhaseTimer and organize phases with
+the organizer's own --profile timer, so the numbers match what those modes
+report. Drawing cannot be timed without a window: run the explorer with
+--profile for render times. Every result is printed as a JSON line and the
+whole run is saved to --out; --compare OLD_FILE prints the change against an
+earlier run and exits with status 1 if anything got more than
+COMPARE_TOLERANCE slower.
+
+startup runs every headless cli.py command as a fresh process, N times each,
+and prints one JSON line per command with the median and worst wall time in
+milliseconds (plus the same for a bare interpreter, the floor nothing can go
+below). Each command works on a small scratch tree so the numbers measure
+start-up cost, not the filesystem, and is run once before timing so the
+bytecode cache and the OS file cache are warm.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import listing
+import profiling
+
+CLI_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py")
+STARTUP_RUNS = 15
+STARTUP_TARGET_MS = 100 # Budget for a headless command, interpreter included
+
+# --- Synthetic tree settings ---
+FLAT_FILES = 1_000_000 # Files in the flat folder
+DEEP_LEVELS = 64 # Nesting depth of the deep tree
+DEEP_FILES = 200 # Files per level of the deep tree
+DEEP_DIRS = 5 # Folders per level; only the first one goes deeper
+MIXED_FILES = 100_000 # Files in the mixed-extension folder
+LARGE_FILES = 4 # Files in the large-file folder
+LARGE_FILE_MB = 256 # Size of each large file
+LIST_REPEATS = 3 # Listings per tree; the median is reported
+RESULTS_FILE = "benchmark_results.json"
+COMPARE_TOLERANCE = 0.10 # Slowdown reported as a regression by --compare
+
+# Extensions cycled through for the flat and deep trees (the last two are unknown to the organizer)
+TREE_EXTENSIONS = [".txt", ".jpg", ".pdf", ".py", ".mp3", ".zip", ".docx", ".csv", ".dat", ""]
+
+
+# --- Tree generation ---
+
+def touch_files(folder, count, prefix="file"):
+    """Creates count empty files in folder, cycling through TREE_EXTENSIONS."""
+    for i in range(count):
+        name = f"{prefix}{i:07d}{TREE_EXTENSIONS[i % len(TREE_EXTENSIONS)]}"
+        os.close(os.open(os.path.join(folder, name), os.O_CREAT | os.O_WRONLY, 0o644))
+
+
+def make_flat_tree(root, count):
+    """One folder with count files."""
+    os.makedirs(root)
+    touch_files(root, count)
+    return root
+
+
+def make_deep_tree(root, levels, files_per_level, dirs_per_level):
+    """A chain of levels nested folders with files and side folders at every level.
+
+    Returns the folders along the chain, outermost first.
+    """
+    chain = []
+    folder = root
+    for level in range(levels):
+        os.makedirs(folder)
+        chain.append(folder)
+        touch_files(folder, files_per_level, prefix=f"level{level}_")
+        for d in range(1, dirs_per_level):
+            side = os.path.join(folder, f"side{d}")
+            os.mkdir(side)
+            touch_files(side, 2, prefix="side")
+        folder = os.path.join(folder, "d0")
+    return chain
+
+
+def make_mixed_tree(root, count, organizer):
+    """One folder with count small files: mostly known extensions, plus files only their content identifies.
+
+    Every fifth file has no useful extension but starts with one of the
+    organizer's MAGIC_SIGNATURES; every tenth is unidentifiable and ends up in
+    OTHER_FOLDER_NAME.
+    """
+    os.makedirs(root)
+    extensions = sorted(organizer.FILE_TYPE_MAPPINGS)
+    signatures = [signature for offset, signature, _ in organizer.MAGIC_SIGNATURES if offset == 0]
+    for i in range(count):
+        if i % 10 == 0:
+            name, data = f"mixed{i:07d}.unknown", b"\0plain data\n"
+        elif i % 5 == 0:
+            name, data = f"mixed{i:07d}", signatures[i % len(signatures)] + b"\0" * 64
+        else:
+            name, data = f"mixed{i:07d}{extensions[i % len(extensions)]}", b"x" * (i % 4096)
+        with open(os.path.join(root, name), "wb") as f:
+            f.write(data)
+    return root
+
+
+def make_large_tree(root, count, size_mb):
+    """count files of size_mb MB each, written with real (incompressible) data."""
+    os.makedirs(root)
+    block = os.urandom(1024 * 1024)
+    for i in range(count):
+        with open(os.path.join(root, f"large{i}.bin"), "wb") as f:
+            for _ in range(size_mb):
+                f.write(block)
+    return root
+
+
+# --- Benchmarks ---
+
+def bench_list(path, repeats=LIST_REPEATS):
+    """Lists path like the explorer does, repeats times; returns the median run."""
+    runs = []
+    for _ in range(repeats):
+        timer = profiling.PhaseTimer("list", path=path)
+        with timer.phase("scan"):
+            entries = list(listing.scan_directory(path, with_stat=False))
+        with timer.phase("sort"):
+            table = listing.ListingTable(entries)
+            order = table.sort_order(listing.COLUMN_NAME)
+        with timer.phase("stat"):
+            for index in table.missing_stat():
+                table.update_stat(index, *listing.stat_values(entries[index]))
+        with timer.phase("resort"):
+            table.sort_order(listing.COLUMN_SIZE, descending=True)
+        with timer.phase("filter"):
+            listing.filter_order(table.name_keys, order, "file00012")
+        runs.append((timer.total(), timer))
+    runs.sort(key=lambda run: run[0])
+    seconds, timer = runs[len(runs) // 2]
+    record = timer.record()
+    return {"benchmark": "list_flat", "items": len(entries), "seconds": round(seconds, 4),
+            "items_per_s": round(len(entries) / seconds), "phases_ms": record["phases_ms"]}
+
+
+def bench_navigate(chain):
+    """Opens every folder of chain in turn, then goes back up through a ListingCache."""
+    cache = listing.ListingCache()
+    opened = []
+    for path in chain:
+        start = time.perf_counter()
+        mtime = listing.directory_mtime(path)
+        table = listing.ListingTable(list(listing.scan_directory(path, with_stat=False)))
+        table.sort_order(listing.COLUMN_NAME)
+        cache.put(path, mtime, table)
+        opened.append(time.perf_counter() - start)
+    back = []
+    for path in reversed(chain):
+        start = time.perf_counter()
+        cache.get(path).sort_order(listing.COLUMN_NAME)
+        back.append(time.perf_counter() - start)
+    return {"benchmark": "navigate_deep", "steps": len(chain), "seconds": round(sum(opened) + sum(back), 4),
+            "open_median_ms": round(statistics.median(opened) * 1000, 2), "open_max_ms": round(max(opened) * 1000, 2),
+            "back_median_ms": round(statistics.median(back) * 1000, 3), "back_max_ms": round(max(back) * 1000, 3)}
+
+
+def bench_organize(organizer, name, source, dest, recursive=False, workers=None):
+    """Organizes source into dest (pipeline or recursive mode) with the organizer's profiling on."""
+    import contextlib
+    import pathlib
+    organizer.SOURCE_DIR = pathlib.Path(source)
+    organizer.DEST_DIR = pathlib.Path(dest)
+    organizer.LOG_FILE = organizer.DEST_DIR / organizer.LOG_FILE.name
+    organizer.PROFILE = organizer.RunProfile()
+    workers = workers or organizer.MAX_WORKERS
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull): # Progress messages
+            organizer.setup_logging()
+            start = time.perf_counter()
+            if recursive:
+                organizer.organize_files_recursive(workers=workers)
+            else:
+                organizer.organize_files_pipeline(workers=workers)
+            seconds = time.perf_counter() - start
+        profile = organizer.PROFILE
+    finally:
+        organizer.PROFILE = None
+    files = profile.counts.get("files", 0)
+    byte_count = profile.counts.get("bytes", 0)
+    return {"benchmark": f"organize_{name}", "mode": "recursive" if recursive else "pipeline", "files": files,
+            "bytes": byte_count, "seconds": round(seconds, 4), "files_per_s": round(files / seconds),
+            "mb_per_s": round(byte_count / 1048576 / seconds, 1),
+            "phases_ms": {phase: round(s * 1000, 1) for phase, s in profile.seconds.items()}}
+
+
+def time_command(argv, runs):
+    """Runs argv runs times, after one untimed warm-up run; returns the wall times in milliseconds."""
+    subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def bench_startup(runs=STARTUP_RUNS):
+    """Yields one result dict per command."""
+    with tempfile.TemporaryDirectory() as scratch:
+        source = os.path.join(scratch, "source")
+        os.mkdir(source)
+        for i in range(20):
+            with open(os.path.join(source, f"file{i}.txt"), "w") as f:
+                f.write("x")
+        commands = {
+            "python": [sys.executable, "-c", "pass"],
+            "list": [sys.executable, CLI_SCRIPT, "list", source],
+            "du": [sys.executable, CLI_SCRIPT, "du", scratch],
+            "search": [sys.executable, CLI_SCRIPT, "search", "file", "--db", os.path.join(scratch, "index.sqlite3")],
+            "organize": [sys.executable, CLI_SCRIPT, "organize", source, os.path.join(scratch, "dest"), "--dry-run"],
+        }
+        for name, argv in commands.items():
+            times = time_command(argv, runs)
+            median = statistics.median(times)
+            yield {"benchmark": "startup", "command": name, "runs": runs, "median_ms": round(median, 1),
+                   "max_ms": round(max(times), 1), "within_target": median < STARTUP_TARGET_MS}
+
+
+def run_scenarios(args):
+    """Yields the results of the scenarios picked in args, building each tree just before it is needed."""
+    organizer = None
+    if {"deep", "mixed", "large"} & args.scenarios:
+        import cli
+        organizer = cli.load_organizer()
+
+    with tempfile.TemporaryDirectory(dir=args.work_dir) as work:
+        dest_parent = args.dest_dir or work
+
+        def timed_setup(label, make, *make_args):
+            start = time.perf_counter()
+            result = make(*make_args)
+            print(f"Built {label} tree in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+            return result
+
+        def organize(name, source, recursive=False):
+            dest = tempfile.mkdtemp(prefix=f"organized_{name}_", dir=dest_parent)
+            try:
+                return bench_organize(organizer, name, source, dest, recursive, args.workers)
+            finally:
+                shutil.rmtree(dest, ignore_errors=True)
+
+        if "flat" in args.scenarios:
+            flat = timed_setup("flat", make_flat_tree, os.path.join(work, "flat"), args.flat_files)
+            yield bench_list(flat, args.repeats)
+            shutil.rmtree(flat)
+        if "deep" in args.scenarios:
+            chain = timed_setup("deep", make_deep_tree, os.path.join(work, "deep"), args.deep_levels,
+                                DEEP_FILES, DEEP_DIRS)
+            yield bench_navigate(chain)
+            yield organize("deep", chain[0], recursive=True)
+        if "mixed" in args.scenarios:
+            mixed = timed_setup("mixed", make_mixed_tree, os.path.join(work, "mixed"), args.mixed_files, organizer)
+            yield organize("mixed", mixed)
+        if "large" in args.scenarios:
+            large = timed_setup("large", make_large_tree, os.path.join(work, "large"), args.large_files,
+                                args.large_mb)
+            yield organize("large", large)
+        if "startup" in args.scenarios:
+            yield from bench_startup()
+
+
+def result_key(result):
+    return result["benchmark"] + (f"/{result['command']}" if "command" in result else "")
+
+
+def compare_results(results, old_file):
+    """Yields one comparison dict per result also found in old_file (a saved --out file)."""
+    with open(old_file, encoding="utf-8") as f:
+        old = {result_key(result): result for result in json.load(f)["results"]}
+    for result in results:
+        before = old.get(result_key(result))
+        if before is None:
+            continue
+        metric = "median_ms" if "median_ms" in result else "seconds"
+        change = result[metric] / before[metric] - 1 if before[metric] else 0.0
+        yield {"compare": result_key(result), "metric": metric, "old": before[metric], "new": result[metric],
+               "change_pct": round(change * 100, 1), "regression": change > COMPARE_TOLERANCE}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the explorer and organizer tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("run", help="time listing, navigation and organize on synthetic trees")
+    p.add_argument("--scenarios", default="flat,deep,mixed,large,startup",
+                   type=lambda text: set(text.split(",")), help="comma-separated subset of the default")
+    p.add_argument("--flat-files", type=int, default=FLAT_FILES)
+    p.add_argument("--deep-levels", type=int, default=DEEP_LEVELS)
+    p.add_argument("--mixed-files", type=int, default=MIXED_FILES)
+    p.add_argument("--large-files", type=int, default=LARGE_FILES)
+    p.add_argument("--large-mb", type=int, default=LARGE_FILE_MB, help="size of each large file")
+    p.add_argument("--repeats", type=int, default=LIST_REPEATS, help="listings per tree (the median is kept)")
+    p.add_argument("--workers", type=int, help="organizer workers (default: its MAX_WORKERS)")
+    p.add_argument("--work-dir", help="where the trees are built (default: the system temp directory)")
+    p.add_argument("--dest-dir", help="where organized files go; another filesystem turns moves into copies")
+    p.add_argument("--out", default=RESULTS_FILE, help=f"results file (default: {RESULTS_FILE})")
+    p.add_argument("--compare", metavar="OLD_FILE", help="compare with the results file of an earlier run")
+
+    p = commands.add_parser("startup", help="start-up time of each cli.py command")
+    p.add_argument("--runs", type=int, default=STARTUP_RUNS)
+    args = parser.parse_args(argv)
+
+    if args.command == "startup":
+        for result in bench_startup(args.runs):
+            print(json.dumps(result), flush=True)
+        return 0
+
+    results = []
+    for result in run_scenarios(args):
+        print(json.dumps(result), flush=True)
+        results.append(result)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"created": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(),
+                   "platform": platform.platform(), "cpus": os.cpu_count(), "results": results}, f, indent=1)
+    print(f"Results saved to {args.out}", file=sys.stderr)
+
+    if args.compare:
+        regressions = 0
+        for comparison in compare_results(results, args.compare):
+            print(json.dumps(comparison))
+            regressions += comparison["regression"]
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
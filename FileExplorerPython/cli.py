@@ -0,0 +1,204 @@
+"""Command-line entry point shared by the explorer and the organizer.
+
+    python cli.py list PATH            entries of a directory
+    python cli.py search QUERY         names from the explorer's search index
+    python cli.py du PATH [PATH ...]   recursive folder sizes
+    python cli.py organize SRC DEST    sort SRC into category folders in DEST
+    python cli.py gui                  start the explorer window
+
+Every command except gui writes one JSON object per line to stdout, so the
+output can be piped into jq or read line by line from scripts; messages go to
+stderr. The modules a command needs are imported inside that command, and
+tkinter only by gui, so the headless commands start quickly and work on
+machines without a display.
+"""
+import argparse
+import json
+import os
+import sys
+
+ORGANIZER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "# file_organizer.py")
+
+
+def emit(record, out=None):
+    """Writes one JSON line."""
+    (out or sys.stdout).write(json.dumps(record) + "\n")
+
+
+def entry_record(entry):
+    """JSON-ready dict for a listing.Entry."""
+    return {"name": entry.name, "path": entry.path, "kind": entry.kind, "size": entry.size, "mtime": entry.mtime}
+
+
+def cmd_list(args):
+    import listing
+    try:
+        table = listing.ListingTable(list(listing.scan_directory(args.path, include_hidden=args.all)))
+    except OSError as e:
+        print(f"Error: Cannot list '{args.path}': {e}", file=sys.stderr)
+        return 1
+    entries = table.entries
+    for index in table.sort_order(args.sort, args.descending):
+        emit(entry_record(entries[index]))
+    return 0
+
+
+def cmd_search(args):
+    import indexer
+    db_path = args.db or indexer.INDEX_DB
+    if args.update:
+        indexer.FileIndexer(root=args.root or indexer.INDEX_ROOT, db_path=db_path).crawl()
+    for entry in indexer.search(db_path, args.query, limit=args.limit or indexer.SEARCH_LIMIT):
+        emit(entry_record(entry))
+    return 0
+
+
+def cmd_du(args):
+    import dirsize
+    paths = []
+    status = 0
+    for path in map(os.path.abspath, args.paths):
+        try:
+            with os.scandir(path): # The calculator counts unreadable folders as empty, so check first
+                paths.append(path)
+        except OSError as e:
+            print(f"Error: Cannot read '{path}': {e}", file=sys.stderr)
+            emit({"path": path, "size": None, "error": str(e)})
+            status = 1
+    totals = dirsize.DirSizeCalculator(workers=args.workers or dirsize.SIZE_WORKERS).compute(paths)
+    for path in paths:
+        emit({"path": path, "size": totals.get(path)})
+    return status
+
+
+def load_organizer():
+    """Imports "# file_organizer.py" (its file name is not a valid module name)."""
+    import importlib.util
+    spec = importlib.util.spec_from_file_location("file_organizer", ORGANIZER_SCRIPT)
+    organizer = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(organizer)
+    return organizer
+
+
+def cmd_organize(args):
+    import contextlib
+    import pathlib
+    import time
+    organizer = load_organizer()
+    organizer.SOURCE_DIR = pathlib.Path(args.source).resolve()
+    organizer.DEST_DIR = pathlib.Path(args.dest).resolve()
+    organizer.LOG_FILE = organizer.DEST_DIR / organizer.LOG_FILE.name
+    source, dest = organizer.SOURCE_DIR, organizer.DEST_DIR
+    if source == dest or dest.is_relative_to(source):
+        print(f"Error: Destination '{dest}' cannot be the same as or inside the source '{source}'.", file=sys.stderr)
+        return 1
+    if not source.is_dir():
+        print(f"Error: Source directory '{source}' not found or is not a directory.", file=sys.stderr)
+        return 1
+
+    out = sys.stdout
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr): # The organizer's progress messages
+        sniff_cache = None
+        if not args.no_sniff:
+            sniff_cache = organizer.SniffCache(None if args.dry_run or not dest.is_dir() else dest / organizer.SNIFF_CACHE_NAME)
+        try:
+            moves, skipped_count = organizer.plan_moves(on_conflict=args.on_conflict or organizer.ON_CONFLICT,
+                                                        sniff_cache=sniff_cache)
+        finally:
+            if sniff_cache is not None:
+                sniff_cache.close()
+
+        if args.dry_run:
+            for original_path, new_path, target_folder_name, size in moves:
+                emit({"type": "plan", "source": str(original_path), "dest": str(new_path),
+                      "category": target_folder_name, "size": size}, out)
+            emit({"type": "summary", "planned": len(moves), "skipped": skipped_count}, out)
+            return 0
+
+        if not organizer.setup_logging():
+            return 1
+        for target_folder_name in {move[2] for move in moves}:
+            (dest / target_folder_name).mkdir(parents=True, exist_ok=True)
+
+        def on_result(move, error):
+            original_path, new_path, target_folder_name, size = move
+            emit({"type": "move", "source": str(original_path), "dest": str(new_path), "category": target_folder_name,
+                  "size": size, "error": None if error is None else str(error)}, out)
+
+        from concurrent.futures import ThreadPoolExecutor
+        run_log = organizer.RunLog(dest / organizer.RUN_LOG_NAME, "cli")
+        with organizer.BufferedLogWriter(organizer.LOG_FILE, run_log=run_log) as log_writer, \
+                ThreadPoolExecutor(max_workers=args.workers or organizer.MAX_WORKERS) as pool:
+            moved_count, moved_bytes, error_count = organizer.run_moves(moves, pool, log_writer, on_result=on_result)
+
+    emit({"type": "summary", "run_id": run_log.run_id, "moved": moved_count, "bytes": moved_bytes,
+          "skipped": skipped_count, "errors": error_count, "seconds": round(time.perf_counter() - start, 3)})
+    return 1 if error_count else 0
+
+
+def cmd_gui(args):
+    import desktop_explorer # The only command that loads tkinter
+    import profiling
+    app = desktop_explorer.FileExplorerApp(profile=args.profile or args.cprofile is not None)
+    if args.cprofile:
+        profiling.run_cprofile(app.mainloop, args.cprofile)
+    else:
+        app.mainloop()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="File explorer and organizer tools (JSON lines output).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("list", help="list a directory")
+    p.add_argument("path", nargs="?", default=".")
+    p.add_argument("--all", action="store_true", help="include hidden entries")
+    p.add_argument("--sort", choices=["name", "size", "modified", "type"], default="name")
+    p.add_argument("--descending", action="store_true")
+    p.set_defaults(func=cmd_list)
+
+    p = commands.add_parser("search", help="search the filename index built by the explorer")
+    p.add_argument("query")
+    # Defaults are left to the modules, which are only imported once the command runs
+    p.add_argument("--limit", type=int, help="max results (default: indexer.SEARCH_LIMIT)")
+    p.add_argument("--db", help="index database (default: the explorer's)")
+    p.add_argument("--update", action="store_true", help="bring the index up to date before searching")
+    p.add_argument("--root", help="directory indexed by --update (default: indexer.INDEX_ROOT)")
+    p.set_defaults(func=cmd_search)
+
+    p = commands.add_parser("du", help="recursive size of directories")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("--workers", type=int, help="directories scanned in parallel")
+    p.set_defaults(func=cmd_du)
+
+    p = commands.add_parser("organize", help="sort the files of SOURCE into category folders in DEST")
+    p.add_argument("source")
+    p.add_argument("dest")
+    p.add_argument("--dry-run", action="store_true", help="only print the planned moves")
+    p.add_argument("--on-conflict", choices=["rename", "skip"], help="default: the organizer's ON_CONFLICT")
+    p.add_argument("--no-sniff", action="store_true", help="categorize by extension only")
+    p.add_argument("--workers", type=int, help="parallel moves (default: the organizer's MAX_WORKERS)")
+    p.set_defaults(func=cmd_organize)
+
+    p = commands.add_parser("gui", help="open the explorer window")
+    p.add_argument("--profile", action="store_true", help="show per-phase listing times in the status bar")
+    p.add_argument("--cprofile", metavar="FILE", help="also save cProfile statistics of the UI thread to FILE")
+    p.set_defaults(func=cmd_gui)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except BrokenPipeError: # Output piped into head, less, ...
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno()) # Silences the flush at exit
+        return 0
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
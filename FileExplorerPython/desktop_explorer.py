@@ -1,4 +1,6 @@
 # /full/path/to/your/project/desktop_explorer.py
+import argparse
+import base64
 import tkinter as tk
 from tkinter import ttk, font # Import font module
 from tkinter import messagebox
@@ -7,9 +9,36 @@ import pathlib
 import subprocess
 import sys
 import platform # Import platform module to check OS
+import queue
+import threading
+import time
+
+import dirsize
+import indexer
+import listing
+import preview
+import profiling
+from virtual_list import VirtualListView
+
+# --- Background listing settings ---
+LIST_BATCH_SIZE = 2000 # Max entries per batch sent from the listing worker to the UI
+LIST_FLUSH_SECONDS = 0.05 # Send a partial batch at least this often so the first rows appear quickly
+LIST_POLL_MS = 30 # How often the UI checks for new batches
+SEARCH_DEBOUNCE_MS = 150 # Wait this long after the last keystroke before querying the index
+FILTER_DEBOUNCE_MS = 60 # Same for the in-directory filter, which only works on names in memory
+STAT_BATCH_SIZE = 1000 # Entries stat'ed per batch by the background size/date loader
+PREVIEW_DEBOUNCE_MS = 120 # Selection must rest this long before a preview is loaded (fast arrow scrolling)
+
+# Columns of the file list: (id, title, width in pixels or None to stretch, anchor)
+FILE_COLUMNS = [
+    (listing.COLUMN_NAME, "Name", None, tk.W),
+    (listing.COLUMN_SIZE, "Size", 100, tk.E),
+    (listing.COLUMN_MODIFIED, "Modified", 140, tk.W),
+    (listing.COLUMN_TYPE, "Type", 100, tk.W),
+]
 
 class FileExplorerApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, profile=False):
         super().__init__()
         self.title("Cross-Platform File Explorer")
         self.geometry("800x600") # Even larger default size for better spacing
@@ -49,46 +78,95 @@ class FileExplorerApp(tk.Tk):
         top_frame = ttk.Frame(self)
         top_frame.pack(fill=tk.X, padx=10, pady=(10, 5)) # More vertical padding top
 
+        self.back_button = ttk.Button(top_frame, text="◀", command=self.go_back, width=3, state=tk.DISABLED)
+        self.back_button.pack(side=tk.LEFT, padx=(0, 2))
+
+        self.forward_button = ttk.Button(top_frame, text="▶", command=self.go_forward, width=3, state=tk.DISABLED)
+        self.forward_button.pack(side=tk.LEFT, padx=(0, 5))
+
         self.up_button = ttk.Button(top_frame, text="Up", command=self.go_up, width=5)
         self.up_button.pack(side=tk.LEFT, padx=(0, 5))
 
         self.home_button = ttk.Button(top_frame, text="Home", command=self.go_home, width=6)
         self.home_button.pack(side=tk.LEFT, padx=(0, 10))
 
+        # "Calculate sizes" mode: recursive sizes for every folder in the listing
+        self.sizes_var = tk.BooleanVar(value=False)
+        self.sizes_check = ttk.Checkbutton(top_frame, text="Folder sizes", variable=self.sizes_var, command=self._on_sizes_toggled)
+        self.sizes_check.pack(side=tk.LEFT, padx=(0, 10))
+
         self.path_var = tk.StringVar(value=str(self.current_path))
         self.path_entry = ttk.Entry(top_frame, textvariable=self.path_var, state='readonly', font=self.path_font)
         self.path_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
-        self.style.configure("TEntry", padding=(5, 3)) # Add internal padding to entry
-
-        # Main frame for the listbox and scrollbar
-        list_frame = ttk.Frame(self)
-        list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10)) # Add padding
 
-        # Configure Listbox style (e.g., selection color)
-        self.style.map("TListbox",
-                       background=[('selected', '#0078D7'), ('!selected', 'white')], # Example: Blue selection like Windows Explorer
-                       foreground=[('selected', 'white'), ('!selected', 'black')])
+        # Find-as-you-type search over the whole indexed tree
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(top_frame, textvariable=self.search_var, width=25, font=self.path_font)
+        self.search_entry.pack(side=tk.RIGHT, padx=(10, 0))
+        ttk.Label(top_frame, text="Search:").pack(side=tk.RIGHT, padx=(10, 0))
+        self.style.configure("TEntry", padding=(5, 3)) # Add internal padding to entry
 
+        # Filter box: narrows the listing shown below as you type
+        filter_frame = ttk.Frame(self)
+        filter_frame.pack(fill=tk.X, padx=10, pady=(0, 5))
+        ttk.Label(filter_frame, text="Filter:").pack(side=tk.LEFT, padx=(0, 5))
+        self.filter_var = tk.StringVar()
+        self.filter_entry = ttk.Entry(filter_frame, textvariable=self.filter_var, font=self.path_font)
+        self.filter_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+        # File list and preview pane side by side; the divider can be dragged
+        panes = ttk.PanedWindow(self, orient=tk.HORIZONTAL)
+        panes.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10)) # Add padding
+
+        # Main frame for the file list and scrollbar
+        list_frame = ttk.Frame(panes)
+        panes.add(list_frame, weight=3)
+
+        # Preview of the selected item, loaded in the background
+        preview_frame = ttk.Frame(panes)
+        panes.add(preview_frame, weight=1)
+        self.preview_image_label = ttk.Label(preview_frame, anchor=tk.CENTER)
+        self.preview_image_label.pack(fill=tk.X, pady=(0, 5))
+        self.preview_text = tk.Text(preview_frame, width=32, wrap=tk.NONE, relief=tk.FLAT, background="#FAFAFA",
+                                    font=font.nametofont("TkFixedFont"), state=tk.DISABLED)
+        self.preview_text.pack(fill=tk.BOTH, expand=True)
+        self._preview_photo = None # Tk drops images nothing in Python refers to
+
+        # Virtualized list: only the visible rows are drawn, so huge directories stay cheap
+        self.sort_column = listing.COLUMN_NAME # Clicking a column header changes these
+        self.sort_descending = False
+        self._table = None # listing.ListingTable behind the rows currently shown
         self.scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL)
-        self.listbox = tk.Listbox(
+        self.file_list = VirtualListView(
             list_frame,
-            yscrollcommand=self.scrollbar.set,
-            selectmode=tk.SINGLE,
+            columns=FILE_COLUMNS,
+            cell_text=self._cell_text, # Rows are listing.Entry records
             font=self.list_font, # Use defined list font
-            # Apply some ttk styling if possible (depends on theme)
-            # background=self.style.lookup("TListbox", "background"), # Get theme background
-            # foreground=self.style.lookup("TListbox", "foreground"), # Get theme foreground
-            # selectbackground=self.style.lookup("TListbox", "selectbackground"), # Get theme selection background
-            # selectforeground=self.style.lookup("TListbox", "selectforeground")  # Get theme selection foreground
+            yscrollcommand=self.scrollbar.set,
+            on_header_click=self._on_header_click,
+            selectbackground='#0078D7', # Blue selection like Windows Explorer
+            selectforeground='white',
         )
-        self.scrollbar.config(command=self.listbox.yview)
+        self.file_list.set_sort_indicator(self.sort_column, self.sort_descending)
+        self.scrollbar.config(command=self.file_list.yview)
 
         self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.file_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         # --- Bindings ---
-        self.listbox.bind("<Double-Button-1>", self.on_item_double_click) # Double click
-        self.listbox.bind("<Return>", self.on_item_double_click) # Enter key also navigates/opens
+        self.file_list.bind("<Double-Button-1>", self.on_item_double_click) # Double click
+        self.file_list.bind("<Return>", self.on_item_double_click) # Enter key also navigates/opens
+        self.file_list.bind("<<ListboxSelect>>", self._on_select)
+        self.bind("<Alt-Left>", lambda e: self.go_back())
+        self.bind("<Alt-Right>", lambda e: self.go_forward())
+        self.bind("<F5>", lambda e: self.update_list(use_cache=False)) # Force a rescan
+        self.search_entry.bind("<KeyRelease>", self._on_search_key)
+        self.search_entry.bind("<Return>", self._open_first_result)
+        self.search_entry.bind("<Escape>", self._cancel_search)
+        self.filter_entry.bind("<KeyRelease>", self._on_filter_key)
+        self.filter_entry.bind("<Return>", self._open_first_match)
+        self.filter_entry.bind("<Escape>", self._clear_filter)
+        self.filter_entry.bind("<Down>", self._focus_list)
 
         # --- Status Bar (Optional but nice) ---
         self.status_var = tk.StringVar(value="Ready")
@@ -97,84 +175,675 @@ class FileExplorerApp(tk.Tk):
         status_bar.pack(side=tk.BOTTOM, fill=tk.X)
 
         # --- Initial Population ---
+        self._list_job = None # State of the running background listing, if any
+        self.listing_cache = listing.ListingCache() # Recently listed directories, validated by mtime
+        self._history = [] # Visited directories, for Back/Forward
+        self._history_index = -1 # Position of current_path in _history
+        self._search_query = None # Query whose results are shown, None when showing a directory
+        self._search_job = None # Pending/running search, if any
+        self._search_after_id = None # Debounce timer for the search box
+        self.indexer = indexer.FileIndexer() # Keeps the on-disk filename index fresh
+        self.indexer.start()
+        self.size_calculator = dirsize.DirSizeCalculator() # Memoizes folder contents across navigation
+        self._size_job = None # Running folder-size computation, if any
+        self._dir_sizes = {} # Folder path -> (bytes so far, finished)
+        self._stat_job = None # Background loader for sizes/dates not known yet
+        self._full_order = None # Sorted order of _table before filtering
+        self._filter_stack = [] # (filter text, matching order) per keystroke, each refining the one before
+        self._filter_after_id = None # Debounce timer for the filter box
+        self.preview_cache = preview.PreviewCache() # Text heads and thumbnails, on disk
+        self._preview_job = None # Running preview load, if any
+        self._preview_after_id = None # Debounce timer for the preview
+        self.profile = profile # Time the phases of every listing (--profile)
         self.update_list()
 
-    def update_list(self):
-        """Updates the listbox with the contents of the current_path."""
-        self.listbox.delete(0, tk.END) # Clear existing items
+    def update_list(self, use_cache=True, from_history=False):
+        """Shows the contents of current_path.
+
+        A still-valid cached listing is shown immediately; otherwise a background
+        listing is started and its results stream into the file list.
+        """
+        # Cancel any listing still running for the previous directory
+        if self._list_job is not None:
+            self._list_job["cancel"].set()
+            self._list_job = None
+
+        self._clear_search()
+        self._reset_filter()
+        self._cancel_preview()
+        self._show_preview("")
+        self._cancel_sizes()
+        self._cancel_stat_job()
+        if not from_history:
+            self._record_history(self.current_path)
+        self._update_history_buttons()
+
+        self.file_list.delete(0, tk.END) # Clear existing items
+        self.file_list.set_placeholder("")
+        self._table = None
         self.path_var.set(str(self.current_path))
         self.status_var.set(f"Listing: {self.current_path}")
 
-        items = []
+        # Enable/disable Up button
+        # Check if the parent is the same as the current path (indicates root)
+        if self.current_path == self.current_path.parent:
+             self.up_button.config(state=tk.DISABLED)
+        else:
+             self.up_button.config(state=tk.NORMAL)
+
+        profile = profiling.PhaseTimer("list", path=str(self.current_path)) if self.profile else None
+        cached = self.listing_cache.get(self.current_path) if use_cache else None
+        if cached is not None:
+            self.status_var.set(f"Listed {len(cached)} items in: {self.current_path} (cached)")
+            if profile is not None:
+                profile.info["cached"] = True
+            self._show_table(cached, profile)
+            return
+
+        job = {
+            "path": self.current_path,
+            "cancel": threading.Event(),
+            "queue": queue.Queue(),
+            "entries": [],
+            "profile": profile, # PhaseTimer with --profile, else None
+        }
+        self._list_job = job
+        worker = threading.Thread(target=self._list_worker, args=(job["path"], job["cancel"], job["queue"]), daemon=True)
+        worker.start()
+        self.after(LIST_POLL_MS, self._drain_listing, job)
+
+    @staticmethod
+    def _list_worker(path, cancel_event, out_queue):
+        """Runs in a worker thread: scans path and sends batches of Entry records to out_queue.
+
+        Once the scan is complete it also builds the ListingTable (with its name
+        order), the indices still missing stat data and the cache size estimate,
+        which take seconds for a million entries and would freeze the window on
+        the Tk thread. Never touches Tk; the main thread picks the batches up in
+        _drain_listing.
+        """
+        try:
+            start = time.perf_counter()
+            # Taken before scanning, so any change made during the scan invalidates the cache entry
+            mtime = listing.directory_mtime(path)
+            entries = []
+            batch = []
+            last_flush = time.monotonic()
+            # Hidden files/folders are skipped for simplicity. Sizes and dates are
+            # loaded afterwards by _start_stat_job, so names show up without waiting on stat()
+            for entry in listing.scan_directory(path, with_stat=False, cancel_event=cancel_event):
+                entries.append(entry)
+                batch.append(entry)
+
+                # Flush on size, or on time so the first screenful shows up right away
+                now = time.monotonic()
+                if len(batch) >= LIST_BATCH_SIZE or now - last_flush >= LIST_FLUSH_SECONDS:
+                    out_queue.put(("batch", batch))
+                    batch = []
+                    last_flush = now
+
+            if cancel_event.is_set():
+                return # User navigated elsewhere, drop the rest
+            out_queue.put(("batch", batch))
+            scan_seconds = time.perf_counter() - start # For --profile
+            start = time.perf_counter()
+            table = listing.ListingTable(entries)
+            table.sort_order() # Builds the name order every column sorts by
+            missing = table.missing_stat()
+            approx_bytes = listing.estimate_bytes(entries)
+            out_queue.put(("done", table, missing, approx_bytes, mtime, scan_seconds, time.perf_counter() - start))
+        except Exception as e: # Report every failure to the main thread, which shows the dialogs
+            out_queue.put(("error", e))
+
+    def _drain_listing(self, job):
+        """Moves pending batches from a listing worker into the file list (runs on the Tk thread)."""
+        if job is not self._list_job:
+            return # A newer listing replaced this one
+
+        while True:
+            try:
+                message = job["queue"].get_nowait()
+            except queue.Empty:
+                break
+
+            kind = message[0]
+            if kind == "batch":
+                batch = message[1]
+                if batch:
+                    job["entries"].extend(batch)
+                    self.file_list.insert(tk.END, *batch) # Show unsorted until the scan completes
+            elif kind == "done":
+                self._finish_listing(job, *message[1:])
+                return
+            elif kind == "error":
+                self._list_job = None
+                self._on_list_error(job["path"], message[1])
+                return
+
+        self.status_var.set(f"Listing: {job['path']} ({len(job['entries'])} items so far)")
+        self.after(LIST_POLL_MS, self._drain_listing, job)
+
+    def _finish_listing(self, job, table, missing, approx_bytes, mtime, scan_seconds, sort_seconds):
+        """Caches the completed listing, built by _list_worker, and shows it."""
+        self._list_job = None
+        profile = job["profile"]
+        if profile is not None:
+            profile.add("scan", scan_seconds)
+            profile.add("sort", sort_seconds)
+        self.listing_cache.put(job["path"], mtime, table, approx_bytes)
+        self.status_var.set(f"Listed {len(table)} items in: {job['path']}")
+        self._show_table(table, profile, missing)
+
+    def _show_table(self, table, profile=None, missing=None):
+        """Populates the file list with a listing, sorted by the current column.
+
+        profile (a PhaseTimer) gets the sort and render times, and the stat time
+        once the background stat job is done. missing is table.missing_stat(),
+        if the caller already has it.
+        """
+        self._table = table
+        with profiling.phase(profile, "sort"):
+            order = table.sort_order(self.sort_column, self.sort_descending)
+        with profiling.phase(profile, "render"):
+            self._set_order(order, new_rows=True)
+            if profile is not None:
+                self.update_idletasks() # Count the drawing too, which Tk would otherwise do later
+        if self.sizes_var.get():
+            self._start_sizes(table.entries)
+        if missing is None:
+            missing = table.missing_stat()
+        if self._search_query is None and missing:
+            self._start_stat_job(table, missing, profile)
+        else:
+            self._finish_profile(profile, table)
+
+    def _finish_profile(self, profile, table):
+        """Shows the phase timings of a finished listing in the status bar and saves them (--profile)."""
+        if profile is None:
+            return
+        profile.info["items"] = len(table)
+        self.status_var.set(f"Listed {len(table)} items in: {profile.info['path']} ({profile.summary()})")
+        if not profiling.append_stats(profile.record()):
+            self.status_var.set(f"{self.status_var.get()} - could not write {profiling.PROFILE_STATS_FILE}")
+
+    def _cell_text(self, entry, column):
+        """Display text for one cell of the file list."""
+        if column == listing.COLUMN_NAME:
+            # Consider using Unicode symbols or icons later
+            text = f"📁 {entry.name}" if entry.is_dir else f"📄 {entry.name}"
+            if self._search_query is not None:
+                text += f"    — {os.path.dirname(entry.path)}" # Search results come from anywhere in the tree
+            return text
+        if column == listing.COLUMN_SIZE:
+            if entry.is_dir:
+                known = self._dir_sizes.get(entry.path) if self.sizes_var.get() else None
+                if known is None:
+                    return ""
+                size, finished = known
+                return listing.format_size(size) + ("" if finished else "…")
+            return listing.format_size(entry.size)
+        if column == listing.COLUMN_MODIFIED:
+            return listing.format_mtime(entry.mtime)
+        return listing.file_type(entry)
+
+    def _on_header_click(self, column):
+        """Re-sorts by the clicked column; clicking the same column again reverses the order."""
+        if column == self.sort_column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column = column
+            self.sort_descending = False
+        self.file_list.set_sort_indicator(self.sort_column, self.sort_descending)
+        if self._table is not None:
+            # Only the index order changes; entries and their keys are reused as-is
+            self._set_order(self._table.sort_order(self.sort_column, self.sort_descending))
+
+    def _set_order(self, order, new_rows=False):
+        """Shows _table in the given sorted order, narrowed by the filter box.
+
+        new_rows=True also hands the rows of _table to the file list (a new listing).
+        """
+        self._full_order = order
+        self._filter_stack = [] # Earlier filter results follow the old order
+        shown = self._filtered_order()
+        if new_rows:
+            self.file_list.set_items(self._table.entries, shown) # Takes the list over without copying
+        else:
+            self.file_list.set_order(shown)
+        self._update_placeholder()
+
+    def _update_placeholder(self):
+        """Sets the text shown when no rows are visible."""
+        if self._filter_stack or self._search_query is not None:
+            self.file_list.set_placeholder(" (No matches)")
+        else:
+            self.file_list.set_placeholder("" if self._table.entries else " (Directory is empty)")
+
+    # --- Background size/date loading ---
+
+    def _start_stat_job(self, table, indices, profile=None):
+        """Stats the entries of table at indices (those whose size/date is unknown), on a worker thread."""
+        self._cancel_stat_job()
+        job = {"table": table, "cancel": threading.Event(), "queue": queue.Queue(), "profile": profile, "seconds": 0.0}
+        self._stat_job = job
+
+        def worker():
+            entries = table.entries
+            for start in range(0, len(indices), STAT_BATCH_SIZE):
+                if job["cancel"].is_set():
+                    return
+                batch_start = time.perf_counter()
+                batch = [(i,) + listing.stat_values(entries[i]) for i in indices[start:start + STAT_BATCH_SIZE]]
+                job["seconds"] += time.perf_counter() - batch_start # Read by the Tk thread after the None below
+                job["queue"].put(batch)
+            job["queue"].put(None) # Done
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.after(LIST_POLL_MS, self._drain_stat_job, job)
+
+    def _drain_stat_job(self, job):
+        """Applies loaded sizes/dates to the listing (runs on the Tk thread)."""
+        if job is not self._stat_job:
+            return
+        table = job["table"]
+        while True:
+            try:
+                batch = job["queue"].get_nowait()
+            except queue.Empty:
+                break
+            if batch is None:
+                self._stat_job = None
+                if self.sort_column in (listing.COLUMN_SIZE, listing.COLUMN_MODIFIED) and table is self._table:
+                    self._set_order(table.sort_order(self.sort_column, self.sort_descending))
+                self.file_list.refresh()
+                if job["profile"] is not None:
+                    job["profile"].add("stat", job["seconds"])
+                    self._finish_profile(job["profile"], table)
+                return
+            for index, size, mtime in batch:
+                table.update_stat(index, size, mtime)
+        self.file_list.refresh()
+        self.after(LIST_POLL_MS, self._drain_stat_job, job)
+
+    def _cancel_stat_job(self):
+        if self._stat_job is not None:
+            self._stat_job["cancel"].set()
+            self._stat_job = None
+
+    # --- Folder sizes ---
+
+    def _on_sizes_toggled(self):
+        """Starts or stops folder-size calculation for the current listing."""
+        if self.sizes_var.get():
+            if self._list_job is None and self._search_query is None:
+                self._start_sizes(self.file_list.get_items())
+        else:
+            self._cancel_sizes()
+        self.file_list.refresh()
+
+    def _start_sizes(self, entries):
+        """Computes recursive sizes of the folders in entries on a worker thread."""
+        self._cancel_sizes()
+        dirs = [entry.path for entry in entries if entry.is_dir]
+        if not dirs:
+            return
+
+        job = {"cancel": threading.Event(), "queue": queue.Queue(), "total": len(dirs), "finished": 0}
+        self._size_job = job
+
+        def progress(path, size, finished):
+            job["queue"].put((path, size, finished))
+
+        def worker():
+            try:
+                self.size_calculator.compute(dirs, progress=progress, cancel_event=job["cancel"])
+            except Exception as e: # Shown in the status bar by _drain_sizes
+                job["queue"].put(("error", e, None))
+            job["queue"].put(("done", None, None))
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.after(LIST_POLL_MS, self._drain_sizes, job)
+
+    def _drain_sizes(self, job):
+        """Applies partial folder totals to the file list (runs on the Tk thread)."""
+        if job is not self._size_job:
+            return # Cancelled or replaced
+        while True:
+            try:
+                path, size, finished = job["queue"].get_nowait()
+            except queue.Empty:
+                break
+            if path == "error":
+                self.status_var.set(f"Folder size calculation failed: {size}")
+            elif path == "done":
+                self._size_job = None
+                self.file_list.refresh()
+                if not job["cancel"].is_set():
+                    self.status_var.set(f"Folder sizes calculated for {job['total']} folders")
+                return
+            else:
+                self._dir_sizes[path] = (size, finished)
+                if finished:
+                    job["finished"] += 1
+        self.file_list.refresh()
+        self.status_var.set(f"Calculating folder sizes: {job['finished']}/{job['total']} done")
+        self.after(LIST_POLL_MS * 5, self._drain_sizes, job) # Sizes change constantly; redraw a bit less often
+
+    def _cancel_sizes(self):
+        """Stops any running folder-size calculation and forgets the shown totals."""
+        if self._size_job is not None:
+            self._size_job["cancel"].set()
+            self._size_job = None
+        self._dir_sizes = {}
+
+    # --- Search ---
+
+    def _on_search_key(self, event=None):
+        """Debounces typing in the search box."""
+        if event is not None and event.keysym in ("Return", "Escape"):
+            return
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+            self._search_after_id = None
+        # Keys that leave the query as it is (arrows, Shift, spaces) must not reset the list
+        if self.search_var.get().strip() != self._active_search():
+            self._search_after_id = self.after(SEARCH_DEBOUNCE_MS, self._start_search)
+
+    def _active_search(self):
+        """Query being searched or shown, "" when the list shows a directory."""
+        if self._search_job is not None:
+            return self._search_job["query"]
+        return self._search_query or ""
+
+    def _start_search(self):
+        """Queries the index for the search box text on a worker thread."""
+        self._search_after_id = None
+        query = self.search_var.get().strip()
+        if query == self._active_search():
+            return
+        if not query:
+            self._cancel_search()
+            return
+
+        if self._list_job is not None: # A directory listing would overwrite the results
+            self._list_job["cancel"].set()
+            self._list_job = None
+        self._cancel_sizes()
+        self._cancel_stat_job()
+
+        job = {"query": query, "result": None, "error": None, "done": threading.Event()}
+        self._search_job = job
+
+        def worker():
+            try:
+                job["result"] = indexer.search(self.indexer.db_path, query)
+            except Exception as e: # Shown in the status bar by _poll_search
+                job["error"] = e
+            job["done"].set()
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.after(LIST_POLL_MS, self._poll_search, job)
+
+    def _poll_search(self, job):
+        """Shows the results of a finished search (runs on the Tk thread)."""
+        if job is not self._search_job:
+            return # Superseded by a newer query
+        if not job["done"].is_set():
+            self.after(LIST_POLL_MS, self._poll_search, job)
+            return
+
+        self._search_job = None
+        if job["error"] is not None:
+            self.status_var.set(f"Search failed: {job['error']}")
+            return
+
+        results = job["result"]
+        self._search_query = job["query"]
+        self._table = listing.ListingTable(results) # Sizes/dates come from the index
+        self._set_order(self._table.sort_order(self.sort_column, self.sort_descending), new_rows=True)
+        note = " (index is still being built)" if self.indexer.crawling else ""
+        self.status_var.set(f"{len(results)} matches for '{job['query']}'{note}")
+
+    def _open_first_result(self, event=None):
+        """Enter in the search box opens the top result."""
+        if self._search_after_id is not None: # Still debouncing: search right away
+            self.after_cancel(self._search_after_id)
+            self._start_search()
+            return
+        if self._search_query is not None and self.file_list.size():
+            self.file_list.selection_set(0)
+            self.on_item_double_click()
+
+    def _clear_search(self):
+        """Forgets any search state without touching the file list."""
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+            self._search_after_id = None
+        self._search_job = None
+        if self._search_query is not None:
+            self._search_query = None
+            self.search_var.set("")
+
+    def _cancel_search(self, event=None):
+        """Clears the search box and shows the current directory again."""
+        self.search_var.set("")
+        self.update_list() # Served from the listing cache when still valid
+
+    # --- Filter ---
+
+    def _on_filter_key(self, event=None):
+        """Debounces typing in the filter box."""
+        if event is not None and event.keysym in ("Return", "Escape", "Down"):
+            return
+        if self._filter_after_id is not None:
+            self.after_cancel(self._filter_after_id)
+        self._filter_after_id = self.after(FILTER_DEBOUNCE_MS, self._apply_filter)
+
+    def _filtered_order(self):
+        """Returns _full_order narrowed to the names matching the filter box.
+
+        Typing more text only searches the previous matches, and deleting text
+        (Backspace) goes back to results computed before, so each keystroke
+        costs at most one pass over the entries still shown.
+        """
+        text = self.filter_var.get().strip().lower()
+        if not text or self._table is None:
+            self._filter_stack = []
+            return self._full_order
+
+        stack = self._filter_stack
+        # Keep only results the new text narrows down: substrings of it, never globs
+        while stack and stack[-1][0] != text and (
+                listing.is_glob(text) or listing.is_glob(stack[-1][0]) or stack[-1][0] not in text):
+            stack.pop()
+        if stack and stack[-1][0] == text:
+            return stack[-1][1]
+        base = stack[-1][1] if stack else self._full_order
+        order = listing.filter_order(self._table.name_keys, base, text)
+        stack.append((text, order))
+        return order
+
+    def _apply_filter(self):
+        """Narrows the shown rows to the filter box text (runs on the Tk thread)."""
+        self._filter_after_id = None
+        if self._table is None:
+            return # Still listing; the filter is applied when the listing completes
+        shown = self._filtered_order()
+        self.file_list.set_order(shown)
+        self._update_placeholder()
+        if self._filter_stack:
+            self.status_var.set(f"{len(shown)} of {len(self._table)} items match '{self.filter_var.get().strip()}'")
+        else:
+            self.status_var.set(f"Showing all {len(self._table)} items")
+
+    def _open_first_match(self, event=None):
+        """Enter in the filter box opens the top match."""
+        if self._filter_after_id is not None: # Still debouncing: filter right away
+            self.after_cancel(self._filter_after_id)
+            self._apply_filter()
+        if self.file_list.size():
+            self.file_list.selection_set(0)
+            self.on_item_double_click()
+
+    def _focus_list(self, event=None):
+        """Down arrow in the filter box moves to the first row of the list."""
+        if self.file_list.size():
+            self.file_list.focus_set()
+            if not self.file_list.curselection():
+                self.file_list.selection_set(0)
+                self._on_select()
+        return "break"
+
+    def _clear_filter(self, event=None):
+        """Escape in the filter box shows all rows again."""
+        self.filter_var.set("")
+        if self._filter_after_id is not None:
+            self.after_cancel(self._filter_after_id)
+        self._apply_filter()
+
+    def _reset_filter(self):
+        """Empties the filter box without touching the file list (a new directory is coming)."""
+        if self._filter_after_id is not None:
+            self.after_cancel(self._filter_after_id)
+            self._filter_after_id = None
+        self.filter_var.set("")
+        self._filter_stack = []
+
+    # --- Preview ---
+
+    def _on_select(self, event=None):
+        """Schedules a preview of the selected row; while arrow keys are held, only the last row is loaded."""
+        self._cancel_preview()
+        self._preview_after_id = self.after(PREVIEW_DEBOUNCE_MS, self._start_preview)
+
+    def _start_preview(self):
+        """Builds the preview of the selected row on a worker thread."""
+        self._preview_after_id = None
+        selection = self.file_list.curselection()
+        if not selection:
+            return
+        path = self.file_list.get(selection[0]).path
+        job = {"path": path, "cancel": threading.Event(), "result": None, "error": None, "done": threading.Event()}
+        self._preview_job = job
+
+        def worker():
+            try:
+                job["result"] = preview.build_preview(path, self.preview_cache, job["cancel"])
+            except Exception as e: # Shown in the preview pane by _poll_preview
+                job["error"] = e
+            job["done"].set()
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.after(LIST_POLL_MS, self._poll_preview, job)
+
+    def _poll_preview(self, job):
+        """Shows a finished preview (runs on the Tk thread)."""
+        if job is not self._preview_job:
+            return # The selection moved on
+        if not job["done"].is_set():
+            self.after(LIST_POLL_MS, self._poll_preview, job)
+            return
+
+        self._preview_job = None
+        if job["error"] is not None:
+            self._show_preview(f"No preview available:\n{job['error']}")
+            return
+        result = job["result"]
+        if result is None:
+            return # Cancelled
+        image = None
+        if result["kind"] == preview.PREVIEW_IMAGE:
+            try:
+                image = tk.PhotoImage(data=result["data"])
+                if result["subsample"] > 1:
+                    image = image.subsample(result["subsample"])
+            except tk.TclError:
+                image = None # Format variant this Tk cannot decode: metadata only
+            if image is not None and "key" in result: # Cache the small thumbnail, not the original
+                self._cache_thumbnail(result["key"], image)
+        self._show_preview(result["text"], image)
+
+    def _cache_thumbnail(self, key, image):
+        """Stores a thumbnail in the preview cache as base64 PNG, the form PhotoImage(data=...) reads back."""
         try:
-            # Separate directories and files
-            dirs = []
-            files = []
-            for item in self.current_path.iterdir():
-                # Basic check if item is hidden (can be platform dependent)
-                is_hidden = item.name.startswith('.') or (platform.system() == "Windows" and item.stat().st_file_attributes & 2 != 0)
-                if is_hidden:
-                    continue # Skip hidden files/folders for simplicity
-
-                if item.is_dir():
-                    # Consider using Unicode symbols or icons later
-                    dirs.append(f"📁 {item.name}") # Folder symbol
-                else:
-                    # Optionally add size or modification date here
-                    files.append(f"📄 {item.name}") # Document symbol
-
-            # Sort them alphabetically, directories first
-            dirs.sort(key=str.lower)
-            files.sort(key=str.lower)
-            items = dirs + files
-
-        except PermissionError:
-            messagebox.showerror("Permission Error", f"Cannot access directory:\n{self.current_path}\n\nPlease check permissions.")
-            self.status_var.set(f"Permission denied: {self.current_path}")
+            data = self.tk.call(str(image), "data", "-format", "png")
+            if isinstance(data, bytes): # Tk 8.6 returns the PNG file itself
+                data = base64.b64encode(data).decode("ascii")
+            self.preview_cache.put(key, preview.PREVIEW_IMAGE, data)
+        except (tk.TclError, OSError, ValueError, TypeError) as e:
+            print(f"Could not cache the thumbnail: {e}", file=sys.stderr) # The preview is shown regardless
+
+    def _show_preview(self, text, image=None):
+        """Replaces the contents of the preview pane."""
+        self._preview_photo = image
+        self.preview_image_label.config(image=image if image is not None else "")
+        self.preview_text.config(state=tk.NORMAL)
+        self.preview_text.delete("1.0", tk.END)
+        self.preview_text.insert("1.0", text)
+        self.preview_text.config(state=tk.DISABLED)
+
+    def _cancel_preview(self):
+        """Stops a pending or running preview load."""
+        if self._preview_after_id is not None:
+            self.after_cancel(self._preview_after_id)
+            self._preview_after_id = None
+        if self._preview_job is not None:
+            self._preview_job["cancel"].set()
+            self._preview_job = None
+
+    def _on_list_error(self, path, error):
+        """Shows the appropriate dialog for a failed listing and moves somewhere readable."""
+        if isinstance(error, PermissionError):
+            messagebox.showerror("Permission Error", f"Cannot access directory:\n{path}\n\nPlease check permissions.")
+            self.status_var.set(f"Permission denied: {path}")
             # Attempt to go up if possible, otherwise stay put but show error
-            parent = self.current_path.parent
-            if parent != self.current_path:
+            parent = path.parent
+            if parent != path:
                 self.current_path = parent
                 self.update_list() # Try updating parent list
-            return # Stop processing this directory
-        except FileNotFoundError:
-             messagebox.showerror("Not Found", f"Path does not exist:\n{self.current_path}")
-             self.status_var.set(f"Path not found: {self.current_path}")
+        elif isinstance(error, FileNotFoundError):
+             messagebox.showerror("Not Found", f"Path does not exist:\n{path}")
+             self.status_var.set(f"Path not found: {path}")
              self.go_home() # Go back to home directory
-             return
-        except OSError as e: # Catch other OS-level errors (e.g., drive not ready)
-             messagebox.showerror("OS Error", f"Could not read directory:\n{self.current_path}\n\nError: {e}")
-             self.status_var.set(f"OS Error accessing: {self.current_path}")
+        elif isinstance(error, OSError): # Catch other OS-level errors (e.g., drive not ready)
+             messagebox.showerror("OS Error", f"Could not read directory:\n{path}\n\nError: {error}")
+             self.status_var.set(f"OS Error accessing: {path}")
              # Attempt to go up
-             parent = self.current_path.parent
-             if parent != self.current_path:
+             parent = path.parent
+             if parent != path:
                  self.current_path = parent
                  self.update_list()
-             return
-        except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred while listing files:\n{e}")
+        else:
+            messagebox.showerror("Error", f"An unexpected error occurred while listing files:\n{error}")
             self.status_var.set("Unexpected error occurred")
             self.go_home() # Go home on unexpected errors
-            return
-
 
-        # Populate listbox
-        if not items:
-            self.listbox.insert(tk.END, " (Directory is empty)")
-            self.listbox.itemconfig(tk.END, {'foreground': 'grey'}) # Use foreground for color
-        else:
-            for item in items:
-                self.listbox.insert(tk.END, item)
-
-        # Enable/disable Up button
-        # Check if the parent is the same as the current path (indicates root)
-        if self.current_path == self.current_path.parent:
-             self.up_button.config(state=tk.DISABLED)
-        else:
-             self.up_button.config(state=tk.NORMAL)
-
-        self.status_var.set(f"Listed {len(items)} items in: {self.current_path}")
 
+    def _record_history(self, path):
+        """Adds path to the history, dropping any forward entries."""
+        if 0 <= self._history_index < len(self._history) and self._history[self._history_index] == path:
+            return # Refresh of the same directory
+        del self._history[self._history_index + 1:]
+        self._history.append(path)
+        self._history_index = len(self._history) - 1
+
+    def _update_history_buttons(self):
+        self.back_button.config(state=tk.NORMAL if self._history_index > 0 else tk.DISABLED)
+        self.forward_button.config(state=tk.NORMAL if self._history_index < len(self._history) - 1 else tk.DISABLED)
+
+    def go_back(self):
+        """Returns to the previously visited directory (served from the cache when possible)."""
+        if self._history_index > 0:
+            self._history_index -= 1
+            self.current_path = self._history[self._history_index]
+            self.update_list(from_history=True)
+
+    def go_forward(self):
+        """Undoes a go_back."""
+        if self._history_index < len(self._history) - 1:
+            self._history_index += 1
+            self.current_path = self._history[self._history_index]
+            self.update_list(from_history=True)
 
     def go_up(self):
         """Navigates to the parent directory."""
@@ -206,48 +875,28 @@ class FileExplorerApp(tk.Tk):
 
     def on_item_double_click(self, event=None):
         """Handles double-clicking or pressing Enter on an item."""
-        selection_indices = self.listbox.curselection()
+        selection_indices = self.file_list.curselection()
         if not selection_indices:
             return # Nothing selected
 
-        selected_item_text = self.listbox.get(selection_indices[0])
-
-        # Handle the "(Directory is empty)" message
-        if selected_item_text.strip() == "(Directory is empty)":
-            return
-
-        # Remove the prefix symbol and space (adjust index if symbols change)
-        if selected_item_text.startswith("📁 ") or selected_item_text.startswith("📄 "):
-            item_name = selected_item_text[2:] # Correct slice index for 2-character prefix
-        else:
-            # Should not happen with current logic, but handle defensively
-            self.status_var.set(f"Unknown item format: {selected_item_text}")
-            return
-
-        target_path = self.current_path / item_name
+        # The row is the listing.Entry captured during the scan, so no extra
+        # stat/resolve calls are needed to decide what to do with it
+        entry = self.file_list.get(selection_indices[0])
+        target_path = pathlib.Path(entry.path)
 
         try:
-            # Use resolve() to handle symbolic links correctly and get absolute path
-            resolved_path = target_path.resolve()
-
-            if resolved_path.is_dir():
-                self.current_path = resolved_path
+            if entry.is_dir:
+                # A vanished or unreadable directory is reported by the listing itself
+                self.current_path = target_path
                 self.update_list()
-            elif resolved_path.is_file():
+            elif entry.is_file:
                 # Try to open the file with the default application
-                self.open_file(resolved_path)
+                self.open_file(target_path)
             else:
-                # This might happen if the item was deleted between listing and clicking
+                # Broken symlink, device, or an item that vanished during the listing
                 messagebox.showwarning("Not Found", f"Item no longer exists or is not a file/directory:\n{target_path}")
                 self.update_list() # Refresh the list
 
-        except PermissionError:
-             messagebox.showerror("Permission Error", f"Cannot access:\n{target_path}")
-             self.status_var.set(f"Permission denied: {target_path.name}")
-        except FileNotFoundError:
-             messagebox.showerror("Not Found", f"Item no longer exists:\n{target_path}")
-             self.status_var.set(f"Not found: {target_path.name}")
-             self.update_list() # Refresh list
         except Exception as e:
              messagebox.showerror("Error", f"Could not open or access item:\n{target_path}\n\nError: {e}")
              self.status_var.set(f"Error accessing: {target_path.name}")
@@ -284,6 +933,15 @@ class FileExplorerApp(tk.Tk):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-platform file explorer.")
+    parser.add_argument("--profile", action="store_true",
+                        help="show scan/stat/sort/render times of every listing in the status bar and append them "
+                             f"to {profiling.PROFILE_STATS_FILE}")
+    parser.add_argument("--cprofile", metavar="FILE",
+                        help="like --profile, and also save cProfile statistics of the UI thread to FILE on exit "
+                             "(read them with: python -m pstats FILE)")
+    args = parser.parse_args()
+
     # Ensures high-DPI awareness on Windows if possible
     try:
         from ctypes import windll
@@ -296,5 +954,8 @@ if __name__ == "__main__":
         except Exception:
              pass # Ignore if DPI awareness setting fails
 
-    app = FileExplorerApp()
-    app.mainloop()
+    app = FileExplorerApp(profile=args.profile or args.cprofile is not None)
+    if args.cprofile:
+        profiling.run_cprofile(app.mainloop, args.cprofile)
+    else:
+        app.mainloop()
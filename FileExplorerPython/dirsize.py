@@ -0,0 +1,193 @@
+"""Recursive folder sizes computed on a thread pool.
+
+Every directory is read with one os.scandir and one lstat per entry. Symlinks
+are never followed and each directory is entered at most once (tracked by
+device/inode), so symlink loops and bind mounts cannot cause endless walks.
+Files with several hard links are counted once per subtree.
+
+What each directory holds itself (file sizes and the list of subdirectories)
+is memoized by (path, directory mtime). Computing sizes again still visits
+every directory of the tree, but one whose mtime has not changed costs a
+single stat instead of a scan of all its entries, so changes anywhere below
+are picked up. A directory's mtime only changes when entries are added,
+removed or renamed, so a file that grew in place (or got another hard link)
+may not be noticed until the memo entry is evicted.
+"""
+import os
+import stat
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+SIZE_WORKERS = 8 # Directories scanned in parallel
+MEMO_MAX_DIRS = 200_000 # Directories whose contents are kept in memory
+
+
+class Subtree:
+    """Size data for a directory and everything below it."""
+    __slots__ = ("unlinked_bytes", "linked", "files", "dirs")
+
+    def __init__(self, unlinked_bytes=0, linked=None, files=0, dirs=0):
+        self.unlinked_bytes = unlinked_bytes # Sum of files with a single link
+        self.linked = linked if linked is not None else {} # (st_dev, st_ino) -> size, for hard-linked files
+        self.files = files
+        self.dirs = dirs
+
+    @property
+    def total(self):
+        return self.unlinked_bytes + sum(self.linked.values())
+
+    def add(self, other):
+        """Merges another subtree into this one, counting shared hard links once."""
+        self.unlinked_bytes += other.unlinked_bytes
+        self.linked.update(other.linked)
+        self.files += other.files
+        self.dirs += other.dirs
+
+
+def _scan(path, memo_mtime):
+    """Worker task: reads one directory.
+
+    Returns (dir_key, mtime_ns, own, subdirs); own is None when memo_mtime shows
+    the memoized contents are still valid, and mtime_ns is None on errors.
+    """
+    try:
+        st = os.stat(path, follow_symlinks=False)
+    except OSError:
+        return None, None, None, []
+    dir_key = (st.st_dev, st.st_ino)
+    if st.st_mtime_ns == memo_mtime:
+        return dir_key, st.st_mtime_ns, None, []
+
+    own = Subtree(dirs=1)
+    subdirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    est = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue # Vanished while scanning
+                if stat.S_ISDIR(est.st_mode):
+                    subdirs.append(entry.path)
+                elif stat.S_ISREG(est.st_mode):
+                    own.files += 1
+                    if est.st_nlink > 1:
+                        own.linked[(est.st_dev, est.st_ino)] = est.st_size
+                    else:
+                        own.unlinked_bytes += est.st_size
+                # Symlinks, sockets, devices: not followed, not counted
+    except OSError:
+        return dir_key, None, None, []
+    return dir_key, st.st_mtime_ns, own, subdirs
+
+
+class DirSizeCalculator:
+    """Computes recursive directory sizes and remembers finished subtrees."""
+
+    def __init__(self, workers=SIZE_WORKERS, memo_max=MEMO_MAX_DIRS):
+        self.workers = workers
+        self.memo_max = memo_max
+        self._memo = OrderedDict() # path -> (mtime_ns, own Subtree, subdirs) of the directory itself
+        self._lock = threading.Lock() # compute() may run in several threads at once
+
+    def _memo_get(self, path):
+        with self._lock:
+            cached = self._memo.get(path)
+            if cached is not None:
+                self._memo.move_to_end(path)
+            return cached
+
+    def _memo_put(self, path, mtime_ns, own, subdirs):
+        with self._lock:
+            self._memo[path] = (mtime_ns, own, subdirs)
+            self._memo.move_to_end(path)
+            while len(self._memo) > self.memo_max:
+                self._memo.popitem(last=False)
+
+    def compute(self, paths, progress=None, cancel_event=None):
+        """Returns {path: total_bytes} for each directory in paths.
+
+        progress(path, partial_bytes, finished) is called from this thread as
+        totals grow. Returns None if cancel_event was set before completion.
+        """
+        paths = [str(p) for p in paths]
+        partial = {top: 0 for top in paths}
+        outstanding = {top: 0 for top in paths} # Unfinished scans per top-level directory
+        seen_dirs = set() # (st_dev, st_ino) of every directory entered
+        records = {} # path -> (own Subtree, subdirs)
+        results = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {}
+
+            def submit(path, top):
+                cached = self._memo_get(path)
+                future = pool.submit(_scan, path, cached[0] if cached else None)
+                pending[future] = (path, top)
+                outstanding[top] += 1
+
+            for top in paths:
+                submit(top, top)
+
+            while pending:
+                if cancel_event is not None and cancel_event.is_set():
+                    for future in pending:
+                        future.cancel()
+                    return None
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, top = pending.pop(future)
+                    outstanding[top] -= 1
+                    dir_key, mtime_ns, own, subdirs = future.result()
+
+                    if own is None and mtime_ns is not None:
+                        cached = self._memo_get(path)
+                        if cached is None or cached[0] != mtime_ns:
+                            submit(path, top) # Evicted since submission, scan it for real
+                            continue
+                        _, own, subdirs = cached # Unchanged directory: reuse its contents, still visit below
+                    elif own is not None:
+                        self._memo_put(path, mtime_ns, own, subdirs)
+
+                    if dir_key is not None and dir_key in seen_dirs:
+                        pass # Already counted (bind mount or looped directory)
+                    elif mtime_ns is None:
+                        records[path] = (Subtree(), []) # Unreadable, counts as empty
+                    else:
+                        seen_dirs.add(dir_key)
+                        records[path] = (own, subdirs)
+                        partial[top] += own.total
+                        for subdir in subdirs:
+                            submit(subdir, top)
+
+                    if outstanding[top] == 0:
+                        results[top] = self._finish(top, records).total
+                        if progress is not None:
+                            progress(top, results[top], True)
+                    elif progress is not None:
+                        progress(top, partial[top], False)
+
+        return results
+
+    def _finish(self, path, records):
+        """Adds up the subtree totals for path bottom-up."""
+        # Iterative post-order so very deep trees do not hit the recursion limit
+        stack = [(path, False)]
+        totals = {}
+        while stack:
+            current, expanded = stack.pop()
+            record = records.get(current)
+            if record is None:
+                totals[current] = Subtree() # Skipped as a duplicate directory
+                continue
+            own, subdirs = record
+            if not expanded:
+                stack.append((current, True))
+                stack.extend((subdir, False) for subdir in subdirs)
+                continue
+            subtree = Subtree(own.unlinked_bytes, dict(own.linked), own.files, own.dirs)
+            for subdir in subdirs:
+                subtree.add(totals.pop(subdir))
+            totals[current] = subtree
+        return totals[path]
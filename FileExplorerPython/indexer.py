@@ -0,0 +1,256 @@
+"""Persistent filename index for find-as-you-type search.
+
+A background crawler walks the tree under a root directory with a thread pool
+and stores every name, size and mtime in a SQLite database. Each directory's
+mtime is stored too, so later crawls only rescan directories whose contents
+changed. Searches use an index on the lowercase name for prefix matches and an
+FTS5 trigram index (when SQLite supports it) for substring matches.
+"""
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import listing
+
+# --- Configuration ---
+INDEX_ROOT = pathlib.Path.home() # Where the crawl starts
+INDEX_DB = pathlib.Path.home() / ".desktop_explorer" / "index.sqlite3" # On-disk index location
+INDEX_WORKERS = 8 # Directories scanned in parallel (I/O bound, so more than the CPU count is fine)
+INDEX_RESCAN_SECONDS = 600 # Incremental re-crawl interval while the explorer is open
+COMMIT_SECONDS = 1.0 # Commit at least this often so searches see progress during a crawl
+SEARCH_LIMIT = 500 # Max results returned by one search
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    dir_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    size INTEGER,
+    mtime REAL
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files(dir_id);
+CREATE INDEX IF NOT EXISTS files_name ON files(name_lower);
+"""
+
+# Substring search index; needs SQLite 3.34+ for the trigram tokenizer
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS names_fts USING fts5(
+    name_lower, content='files', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+    INSERT INTO names_fts(rowid, name_lower) VALUES (new.id, new.name_lower);
+END;
+CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+    INSERT INTO names_fts(names_fts, rowid, name_lower) VALUES ('delete', old.id, old.name_lower);
+END;
+"""
+
+
+def connect(db_path):
+    """Opens the index database, creating the schema if needed."""
+    db_path = pathlib.Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL") # Readers are not blocked by the crawler
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    try:
+        conn.executescript(FTS_SCHEMA)
+    except sqlite3.OperationalError:
+        pass # No FTS5/trigram: substring search falls back to LIKE
+    conn.commit()
+    return conn
+
+
+def has_fts(conn):
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'names_fts'").fetchone()
+    return row is not None
+
+
+def _scan_dir(path, known_mtime):
+    """Worker task: scans one directory unless its mtime matches known_mtime.
+
+    Returns (path, mtime_ns, rows, subdirs) where rows is None if the directory
+    is unchanged. Symlinked directories are recorded but never followed.
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return path, None, None, [] # Gone or unreadable
+    if mtime_ns == known_mtime:
+        return path, mtime_ns, None, []
+
+    rows = []
+    subdirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                name = entry.name
+                if name.startswith('.'):
+                    continue # Hidden entries are not shown in the explorer either
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    st = entry.stat(follow_symlinks=False) # Free on Windows, one lstat elsewhere
+                    size = None if is_dir else st.st_size
+                    mtime = st.st_mtime
+                except OSError:
+                    is_dir, size, mtime = False, None, None
+                rows.append((name, name.lower(), int(is_dir), size, mtime))
+                if is_dir:
+                    subdirs.append(entry.path)
+    except OSError:
+        return path, None, None, []
+    return path, mtime_ns, rows, subdirs
+
+
+class FileIndexer:
+    """Keeps the on-disk index of root up to date from a background thread."""
+
+    def __init__(self, root=INDEX_ROOT, db_path=INDEX_DB, workers=INDEX_WORKERS):
+        self.root = str(root)
+        self.db_path = pathlib.Path(db_path)
+        self.workers = workers
+        self.dirs_scanned = 0 # Directories re-read during the current/last crawl
+        self.dirs_checked = 0 # Directories visited (changed or not)
+        self.crawling = False
+        self.last_crawl_seconds = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, rescan_seconds=INDEX_RESCAN_SECONDS):
+        """Starts crawling in a daemon thread, repeating every rescan_seconds."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(rescan_seconds,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, rescan_seconds):
+        while not self._stop.is_set():
+            try:
+                self.crawl()
+            except Exception as e: # Never let the indexer take the app down
+                print(f"Indexer error: {e}")
+            self._stop.wait(rescan_seconds)
+
+    def crawl(self):
+        """Walks the tree once, rescanning only directories whose mtime changed."""
+        start = time.monotonic()
+        self.crawling = True
+        self.dirs_scanned = 0
+        self.dirs_checked = 0
+        conn = connect(self.db_path)
+        try:
+            known = dict(conn.execute("SELECT path, mtime_ns FROM dirs"))
+            last_commit = time.monotonic()
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                pending = {pool.submit(_scan_dir, self.root, known.get(self.root))}
+                while pending and not self._stop.is_set():
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path, mtime_ns, rows, subdirs = future.result()
+                        self.dirs_checked += 1
+                        if mtime_ns is None:
+                            self._delete_subtree(conn, path)
+                            continue
+                        if rows is None:
+                            # Unchanged: children come from the index, their own mtimes are checked next
+                            subdirs = self._indexed_subdirs(conn, path)
+                        else:
+                            self.dirs_scanned += 1
+                            self._store_dir(conn, path, mtime_ns, rows, subdirs)
+                        for subdir in subdirs:
+                            pending.add(pool.submit(_scan_dir, subdir, known.get(subdir)))
+
+                    if time.monotonic() - last_commit >= COMMIT_SECONDS:
+                        conn.commit()
+                        last_commit = time.monotonic()
+            conn.commit()
+        finally:
+            conn.close()
+            self.crawling = False
+            self.last_crawl_seconds = time.monotonic() - start
+
+    @staticmethod
+    def _indexed_subdirs(conn, path):
+        rows = conn.execute(
+            "SELECT f.name FROM files f JOIN dirs d ON f.dir_id = d.id WHERE d.path = ? AND f.is_dir = 1",
+            (path,))
+        return [os.path.join(path, name) for (name,) in rows]
+
+    def _store_dir(self, conn, path, mtime_ns, rows, subdirs):
+        """Replaces the indexed contents of one directory."""
+        row = conn.execute("SELECT id FROM dirs WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            dir_id = conn.execute("INSERT INTO dirs(path, mtime_ns) VALUES (?, ?)", (path, mtime_ns)).lastrowid
+        else:
+            dir_id = row[0]
+            # Subdirectories that disappeared take their whole indexed subtree with them
+            current = set(subdirs)
+            for old_subdir in self._indexed_subdirs(conn, path):
+                if old_subdir not in current:
+                    self._delete_subtree(conn, old_subdir)
+            conn.execute("UPDATE dirs SET mtime_ns = ? WHERE id = ?", (mtime_ns, dir_id))
+            conn.execute("DELETE FROM files WHERE dir_id = ?", (dir_id,))
+        conn.executemany(
+            "INSERT INTO files(dir_id, name, name_lower, is_dir, size, mtime) VALUES (?, ?, ?, ?, ?, ?)",
+            [(dir_id,) + r for r in rows])
+
+    @staticmethod
+    def _delete_subtree(conn, path):
+        """Removes a directory and everything indexed below it."""
+        prefix = path.rstrip(os.sep) + os.sep
+        upper = prefix[:-1] + chr(ord(os.sep) + 1) # Range scan on the path index instead of LIKE
+        where = "path = ? OR (path >= ? AND path < ?)"
+        args = (path, prefix, upper)
+        conn.execute(f"DELETE FROM files WHERE dir_id IN (SELECT id FROM dirs WHERE {where})", args)
+        conn.execute(f"DELETE FROM dirs WHERE {where}", args)
+
+
+def search(db_path, query, limit=SEARCH_LIMIT):
+    """Returns up to limit listing.Entry records whose name contains query (case-insensitive).
+
+    Prefix matches come first, then other substring matches.
+    """
+    query = query.strip().lower()
+    if not query or not pathlib.Path(db_path).exists():
+        return []
+
+    conn = sqlite3.connect(str(db_path), timeout=5)
+    try:
+        select = ("SELECT f.id, f.name, d.path, f.is_dir, f.size, f.mtime "
+                  "FROM files f JOIN dirs d ON f.dir_id = d.id ")
+        # Prefix matches: a range scan on the name index
+        rows = conn.execute(select + "WHERE f.name_lower >= ? AND f.name_lower < ? ORDER BY f.name_lower LIMIT ?",
+                            (query, query + "\uffff", limit)).fetchall()
+
+        if len(rows) < limit:
+            seen = {r[0] for r in rows}
+            remaining = limit - len(rows) + len(seen) # Prefix hits show up again in the substring query
+            if len(query) >= 3 and has_fts(conn):
+                phrase = '"' + query.replace('"', '""') + '"'
+                more = conn.execute(select + "WHERE f.id IN (SELECT rowid FROM names_fts WHERE names_fts MATCH ? LIMIT ?)",
+                                    (phrase, remaining)).fetchall()
+            else:
+                pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                more = conn.execute(select + "WHERE f.name_lower LIKE ? ESCAPE '\\' LIMIT ?",
+                                    (pattern, remaining)).fetchall()
+            rows.extend(r for r in more if r[0] not in seen)
+    finally:
+        conn.close()
+
+    return [listing.Entry(name, os.path.join(dir_path, name),
+                          listing.KIND_DIR if is_dir else listing.KIND_FILE, size, mtime, False)
+            for _, name, dir_path, is_dir, size, mtime in rows[:limit]]
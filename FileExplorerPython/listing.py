@@ -0,0 +1,309 @@
+"""Directory listing engine shared by the explorer UI.
+
+Uses os.scandir so the entry type (and on Windows the whole stat result) comes
+straight from the directory read, and stats every entry at most once. The
+records it returns carry everything the UI needs, so clicking an item later
+does not have to touch the filesystem again.
+"""
+import fnmatch
+import os
+import platform
+import re
+import time
+from array import array
+from collections import OrderedDict
+
+# Computed once at import instead of once per entry
+IS_WINDOWS = platform.system() == "Windows"
+FILE_ATTRIBUTE_HIDDEN = 2 # Windows hidden attribute bit
+
+# Entry kinds
+KIND_DIR = "dir"
+KIND_FILE = "file"
+KIND_OTHER = "other" # Broken symlinks, sockets, devices, ...
+
+
+class Entry:
+    """A single directory entry, with the data captured during the scan."""
+    __slots__ = ("name", "path", "kind", "size", "mtime", "hidden")
+
+    def __init__(self, name, path, kind, size, mtime, hidden):
+        self.name = name # Entry name (no directory part)
+        self.path = path # Full path as a string
+        self.kind = kind # KIND_DIR, KIND_FILE or KIND_OTHER
+        self.size = size # Size in bytes, or None if not stat'ed / unreadable
+        self.mtime = mtime # Modification time (epoch seconds), or None
+        self.hidden = hidden # Dot-file or Windows hidden attribute
+
+    @property
+    def is_dir(self):
+        return self.kind == KIND_DIR
+
+    @property
+    def is_file(self):
+        return self.kind == KIND_FILE
+
+    def __repr__(self):
+        return f"Entry({self.name!r}, kind={self.kind!r}, size={self.size!r})"
+
+
+def make_entry(dir_entry, with_stat=True):
+    """Builds an Entry from an os.DirEntry using at most one stat call.
+
+    On Windows the stat data comes from the directory read itself and costs nothing.
+    With with_stat=False on other systems, size and mtime are left as None.
+    """
+    name = dir_entry.name
+    st = None
+    if with_stat or IS_WINDOWS:
+        try:
+            st = dir_entry.stat() # Cached by DirEntry; follows symlinks like is_dir()
+        except OSError:
+            st = None # Broken symlink or entry removed since the directory read
+
+    try:
+        if dir_entry.is_dir():
+            kind = KIND_DIR
+        elif dir_entry.is_file():
+            kind = KIND_FILE
+        else:
+            kind = KIND_OTHER
+    except OSError:
+        kind = KIND_OTHER
+
+    hidden = name.startswith('.')
+    if IS_WINDOWS and st is not None and not hidden:
+        hidden = st.st_file_attributes & FILE_ATTRIBUTE_HIDDEN != 0
+
+    if st is not None:
+        size = st.st_size if kind != KIND_DIR else None
+        mtime = st.st_mtime
+    else:
+        size = None
+        mtime = None
+    return Entry(name, dir_entry.path, kind, size, mtime, hidden)
+
+
+def scan_directory(path, include_hidden=False, with_stat=True, cancel_event=None):
+    """Yields an Entry for every item in path, in directory order.
+
+    Errors opening the directory itself (PermissionError, FileNotFoundError, ...)
+    propagate to the caller. Stops early once cancel_event is set.
+    """
+    with os.scandir(path) as it:
+        for dir_entry in it:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            entry = make_entry(dir_entry, with_stat)
+            if entry.hidden and not include_hidden:
+                continue
+            yield entry
+
+
+def sort_key(entry):
+    """Directories first, then case-insensitive name."""
+    return (entry.kind != KIND_DIR, entry.name.lower())
+
+
+def format_size(size):
+    """Human-readable byte count, e.g. 1536 -> '1.5 KB'."""
+    if size is None:
+        return ""
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            return f"{size} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def stat_values(entry):
+    """Returns (size, mtime) for an Entry scanned with with_stat=False (one stat call).
+
+    Both are None if the entry vanished or is a broken symlink; size is None for directories.
+    """
+    try:
+        st = os.stat(entry.path)
+    except OSError:
+        return None, None
+    return (None if entry.kind == KIND_DIR else st.st_size), st.st_mtime
+
+
+def file_type(entry):
+    """Short type description shown in the Type column, e.g. 'PDF file'."""
+    if entry.kind == KIND_DIR:
+        return "Folder"
+    _, ext = os.path.splitext(entry.name)
+    return f"{ext[1:].upper()} file" if ext else "File"
+
+
+def format_mtime(mtime):
+    """Modification time as shown in the Modified column."""
+    if mtime is None:
+        return ""
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(mtime))
+
+
+# --- Sortable listing ---
+
+COLUMN_NAME = "name"
+COLUMN_SIZE = "size"
+COLUMN_MODIFIED = "modified"
+COLUMN_TYPE = "type"
+
+
+class ListingTable:
+    """Sort keys for one listing, computed once and kept in flat arrays.
+
+    sort_order() returns a list of indices into entries; re-sorting by another
+    column reorders indices only and never re-stats or rebuilds display text.
+    Directories always come first. Unknown sizes/mtimes sort as -1 until
+    update_stat() fills them in.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.dir_flags = bytes(0 if e.kind == KIND_DIR else 1 for e in entries) # 0 sorts first
+        self.name_keys = [e.name.lower() for e in entries]
+        self.size_keys = array('q', (-1 if e.size is None else e.size for e in entries))
+        self.mtime_keys = array('d', (-1.0 if e.mtime is None else e.mtime for e in entries))
+        self.type_keys = [os.path.splitext(k)[1] if f else "" for k, f in zip(self.name_keys, self.dir_flags)]
+        self._name_order = None # Indices sorted by name, the tie-breaker for every other column
+
+    def __len__(self):
+        return len(self.entries)
+
+    def sort_order(self, column=COLUMN_NAME, descending=False):
+        """Returns entry indices sorted by column, directories first."""
+        if self._name_order is None:
+            self._name_order = sorted(range(len(self.entries)), key=self.name_keys.__getitem__)
+        if column == COLUMN_NAME:
+            order = self._name_order[::-1] if descending else list(self._name_order)
+        else:
+            keys = {COLUMN_SIZE: self.size_keys, COLUMN_MODIFIED: self.mtime_keys, COLUMN_TYPE: self.type_keys}[column]
+            # Stable sorts: ties keep name order, then directories are moved to the front
+            order = sorted(self._name_order, key=keys.__getitem__, reverse=descending)
+        order.sort(key=self.dir_flags.__getitem__)
+        return order
+
+    def update_stat(self, index, size, mtime):
+        """Records stat data that arrived after the listing was built."""
+        entry = self.entries[index]
+        entry.size = size
+        entry.mtime = mtime
+        self.size_keys[index] = -1 if size is None else size
+        self.mtime_keys[index] = -1.0 if mtime is None else mtime
+
+    def missing_stat(self):
+        """Indices of entries whose mtime is still unknown."""
+        return [i for i, e in enumerate(self.entries) if e.mtime is None]
+
+
+def is_glob(pattern):
+    """True if pattern uses glob wildcards (*, ? or [...])."""
+    return any(c in pattern for c in "*?[")
+
+
+def filter_order(name_keys, order, text):
+    """Returns the indices in order whose name matches text, keeping their order.
+
+    Glob patterns must match the whole name; any other text matches as a
+    substring. Both are case-insensitive: name_keys are the lowercase names
+    (ListingTable.name_keys).
+    """
+    text = text.lower()
+    if is_glob(text):
+        match = re.compile(fnmatch.translate(text)).match
+        return [i for i in order if match(name_keys[i])]
+    return [i for i in order if text in name_keys[i]]
+
+
+def list_directory(path, include_hidden=False, with_stat=True):
+    """Returns the sorted list of entries in path."""
+    entries = list(scan_directory(path, include_hidden, with_stat))
+    entries.sort(key=sort_key)
+    return entries
+
+
+# --- Listing cache ---
+
+ENTRY_OVERHEAD_BYTES = 250 # Rough size of an Entry record, its fields and its sort keys
+
+
+def estimate_bytes(entries):
+    """Rough memory used by a listing of entries, as counted against ListingCache.max_bytes."""
+    return sum(ENTRY_OVERHEAD_BYTES + 2 * len(e.name) + len(e.path) for e in entries)
+
+
+def directory_mtime(path):
+    """Returns the directory's modification time in nanoseconds (raises OSError)."""
+    return os.stat(path).st_mtime_ns
+
+
+class ListingCache:
+    """LRU cache of directory listings (ListingTable objects), keyed by path.
+
+    Each listing is stored with the directory mtime taken before it was scanned;
+    get() re-stats the directory and drops the listing if the mtime moved, so a
+    stale listing is never returned. The cache is bounded both by the total
+    number of entries and by an estimate of the memory they use. Note that a
+    directory's mtime only changes when entries are added, removed or renamed,
+    so sizes/mtimes of files edited in place may lag until the next rescan.
+    Not thread-safe: use it from the Tk thread only.
+    """
+
+    def __init__(self, max_entries=500_000, max_bytes=128 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._listings = OrderedDict() # path -> (mtime_ns, table, approx_bytes)
+        self._total_entries = 0
+        self._total_bytes = 0
+
+    def get(self, path):
+        """Returns the cached ListingTable for path, or None if missing or stale."""
+        key = str(path)
+        cached = self._listings.get(key)
+        if cached is None:
+            return None
+        try:
+            current_mtime = directory_mtime(key)
+        except OSError:
+            current_mtime = None # Gone or unreadable, let a fresh listing report it
+        if current_mtime != cached[0]:
+            self._remove(key)
+            return None
+        self._listings.move_to_end(key) # Mark as most recently used
+        return cached[1]
+
+    def put(self, path, mtime_ns, table, approx_bytes=None):
+        """Stores a listing taken when the directory had mtime_ns.
+
+        approx_bytes is estimate_bytes(table.entries), if the caller already computed it.
+        """
+        key = str(path)
+        if approx_bytes is None:
+            approx_bytes = estimate_bytes(table.entries)
+        if len(table) > self.max_entries or approx_bytes > self.max_bytes:
+            return # Bigger than the whole cache, not worth evicting everything for
+        if key in self._listings:
+            self._remove(key)
+        self._listings[key] = (mtime_ns, table, approx_bytes)
+        self._total_entries += len(table)
+        self._total_bytes += approx_bytes
+
+        # Evict least recently used listings until both limits are met
+        while self._total_entries > self.max_entries or self._total_bytes > self.max_bytes:
+            oldest = next(iter(self._listings))
+            self._remove(oldest)
+
+    def invalidate(self, path):
+        """Forgets the listing for path, if any."""
+        key = str(path)
+        if key in self._listings:
+            self._remove(key)
+
+    def __len__(self):
+        return len(self._listings)
+
+    def _remove(self, key):
+        _, table, approx_bytes = self._listings.pop(key)
+        self._total_entries -= len(table)
+        self._total_bytes -= approx_bytes
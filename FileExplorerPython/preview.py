@@ -0,0 +1,199 @@
+"""Background preview builder and on-disk preview cache for the explorer.
+
+build_preview() runs in a worker thread and never touches Tk: for text files
+it returns the first lines (read through mmap), for PNG/GIF images the file
+data (base64) and a subsample factor, and for everything else a few lines of
+metadata. The Tk thread turns image data into a PhotoImage and hands the
+finished thumbnail back to the cache, so the expensive decode happens only
+once per file version.
+
+Cached previews live in PREVIEW_CACHE_DIR, one file per (path, size, mtime).
+Reading a cached preview bumps the file's mtime, and the least recently used
+files are deleted once the cache grows past PREVIEW_CACHE_MAX_BYTES.
+"""
+import base64
+import hashlib
+import mmap
+import os
+import pathlib
+import stat
+import threading
+
+import listing
+
+# --- Configuration ---
+PREVIEW_CACHE_DIR = pathlib.Path.home() / ".desktop_explorer" / "previews" # On-disk preview cache
+PREVIEW_CACHE_MAX_BYTES = 64 * 1024 * 1024 # LRU eviction starts above this
+TEXT_PREVIEW_BYTES = 16 * 1024 # Head of a text file shown in the preview
+TEXT_PREVIEW_LINES = 200
+IMAGE_PREVIEW_MAX_BYTES = 16 * 1024 * 1024 # Bigger images only get metadata
+IMAGE_PREVIEW_MAX_PIXELS = 10_000_000 # Same for more pixels: Tk decodes them on its own thread, blocking the UI
+THUMBNAIL_SIZE = 256 # Longest side of a thumbnail, in pixels
+
+PREVIEW_TEXT = "text"
+PREVIEW_IMAGE = "image"
+PREVIEW_INFO = "info"
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class PreviewCache:
+    """Directory of cached previews with LRU eviction by file mtime.
+
+    Thread-safe: workers read from it while the Tk thread stores thumbnails.
+    """
+
+    def __init__(self, cache_dir=PREVIEW_CACHE_DIR, max_bytes=PREVIEW_CACHE_MAX_BYTES):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._sizes = None # file name -> bytes, least recently used first; loaded on first use
+        self._total = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(path, size, mtime_ns):
+        """Cache file stem for one version of a file."""
+        return hashlib.sha1(f"{path}\0{size}\0{mtime_ns}".encode("utf-8", "surrogatepass")).hexdigest()
+
+    def _load(self):
+        if self._sizes is not None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        found = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                found.append((st.st_mtime_ns, entry.name, st.st_size))
+        found.sort()
+        self._sizes = {name: size for _, name, size in found} # dicts keep insertion order
+        self._total = sum(self._sizes.values())
+
+    def get(self, key, kind):
+        """Returns the cached preview text for key, or None."""
+        name = f"{key}.{kind}"
+        with self._lock:
+            try:
+                self._load()
+            except OSError:
+                return None
+            if name not in self._sizes:
+                return None
+            self._sizes[name] = self._sizes.pop(name) # Most recently used goes last
+        try:
+            path = self.cache_dir / name
+            data = path.read_text(encoding="utf-8")
+            os.utime(path) # Keeps the LRU order across sessions
+            return data
+        except OSError:
+            with self._lock:
+                self._total -= self._sizes.pop(name, 0)
+            return None
+
+    def put(self, key, kind, data):
+        """Stores preview text for key, evicting the least recently used previews if needed."""
+        name = f"{key}.{kind}"
+        encoded = data.encode("utf-8", "surrogateescape")
+        with self._lock:
+            try:
+                self._load()
+                temp_path = self.cache_dir / f".{name}.tmp"
+                temp_path.write_bytes(encoded)
+                os.replace(temp_path, self.cache_dir / name)
+            except OSError:
+                return # A read-only or full disk only costs the cache
+            self._total += len(encoded) - self._sizes.pop(name, 0)
+            self._sizes[name] = len(encoded)
+            while self._total > self.max_bytes and self._sizes:
+                oldest = next(iter(self._sizes))
+                self._total -= self._sizes.pop(oldest)
+                try:
+                    os.unlink(self.cache_dir / oldest)
+                except OSError:
+                    pass
+
+
+def _image_size(head):
+    """(width, height) from a PNG or GIF header, or None for other data."""
+    if head.startswith(PNG_SIGNATURE) and len(head) >= 24:
+        return int.from_bytes(head[16:20], "big"), int.from_bytes(head[20:24], "big")
+    if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+        return int.from_bytes(head[6:8], "little"), int.from_bytes(head[8:10], "little")
+    return None
+
+
+def _read_head(path, size):
+    """First TEXT_PREVIEW_BYTES of a file, read through mmap."""
+    length = min(size, TEXT_PREVIEW_BYTES)
+    if length == 0:
+        return b""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ) as mapped:
+            return mapped[:length]
+
+
+def _info_text(path, st, is_dir):
+    """Metadata lines shown for files without a text or image preview."""
+    name = os.path.basename(path)
+    entry = listing.Entry(name, path, listing.KIND_DIR if is_dir else listing.KIND_FILE, None, None, False)
+    lines = [f"Name: {name}", f"Type: {listing.file_type(entry)}"]
+    if not is_dir:
+        lines.append(f"Size: {listing.format_size(st.st_size)} ({st.st_size:,} bytes)")
+    lines.append(f"Modified: {listing.format_mtime(st.st_mtime)}")
+    lines.append(f"Permissions: {stat.filemode(st.st_mode)}")
+    return "\n".join(lines)
+
+
+def build_preview(path, cache, cancel_event=None):
+    """Worker task: returns a preview dict for path, or None if cancel_event was set.
+
+    The dict has "kind" (PREVIEW_TEXT, PREVIEW_IMAGE or PREVIEW_INFO), "text"
+    (file head or metadata), and for images "data" (base64 PNG/GIF data),
+    "subsample" (shrink factor still to apply; 1 for cached thumbnails) and,
+    unless the thumbnail came from the cache, "key" to store it with
+    PreviewCache.put(). Raises OSError if the file cannot be read.
+    """
+    st = os.stat(path)
+    if stat.S_ISDIR(st.st_mode) or not stat.S_ISREG(st.st_mode):
+        return {"kind": PREVIEW_INFO, "text": _info_text(path, st, stat.S_ISDIR(st.st_mode))}
+
+    key = PreviewCache.key(path, st.st_size, st.st_mtime_ns)
+    info = _info_text(path, st, False)
+    for kind in (PREVIEW_IMAGE, PREVIEW_TEXT):
+        cached = cache.get(key, kind)
+        if cached is not None:
+            if kind == PREVIEW_IMAGE:
+                return {"kind": kind, "text": info, "data": cached, "subsample": 1}
+            return {"kind": kind, "text": cached}
+
+    head = _read_head(path, st.st_size)
+    if cancel_event is not None and cancel_event.is_set():
+        return None
+
+    dimensions = _image_size(head)
+    if dimensions is not None:
+        width, height = dimensions
+        if st.st_size > IMAGE_PREVIEW_MAX_BYTES or width * height > IMAGE_PREVIEW_MAX_PIXELS:
+            # A small file can still hold a huge image: only describe it
+            return {"kind": PREVIEW_INFO, "text": f"{info}\nDimensions: {width} x {height}"}
+        with open(path, "rb") as f:
+            data = f.read()
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        subsample = max(1, -(-max(width, height) // THUMBNAIL_SIZE)) # Ceiling division
+        return {"kind": PREVIEW_IMAGE, "text": f"{info}\nDimensions: {width} x {height}",
+                "data": base64.b64encode(data).decode("ascii"), "subsample": subsample, "key": key}
+
+    if b"\0" not in head: # No NUL bytes: treat it as text
+        text = head.decode("utf-8", errors="replace")
+        if len(head) == TEXT_PREVIEW_BYTES:
+            text = text[:text.rfind("\n") + 1] or text # Do not show a cut-off last line
+        lines = text.splitlines()
+        if len(lines) > TEXT_PREVIEW_LINES:
+            text = "\n".join(lines[:TEXT_PREVIEW_LINES])
+        cache.put(key, PREVIEW_TEXT, text)
+        return {"kind": PREVIEW_TEXT, "text": text}
+
+    return {"kind": PREVIEW_INFO, "text": info}
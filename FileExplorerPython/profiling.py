@@ -0,0 +1,87 @@
+"""Per-phase timings for the explorer's --profile mode.
+
+A PhaseTimer follows one listing from the moment it is requested until its
+sizes and dates are loaded, and sums the time spent in each phase (scan,
+stat, sort, render). The explorer shows the summary in its status bar and
+appends one JSON line per listing to PROFILE_STATS_FILE, so sessions can be
+compared later. benchmark.py uses the same timer for its headless runs.
+"""
+import json
+import pathlib
+import time
+from contextlib import contextmanager, nullcontext
+
+# --- Configuration ---
+PROFILE_STATS_FILE = pathlib.Path.home() / ".desktop_explorer" / "profile_stats.jsonl"
+
+
+class PhaseTimer:
+    """Milliseconds spent in each phase of one operation.
+
+    Not thread-safe: workers measure their own phase and hand the seconds to
+    the Tk thread, which calls add().
+    """
+
+    def __init__(self, action, **info):
+        self.action = action # What was timed, e.g. "list"
+        self.info = info # Extra fields for the stats record (path, items, ...)
+        self.seconds = {} # phase -> seconds, in the order the phases first ran
+        self._start = time.perf_counter()
+
+    def add(self, phase, seconds):
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, phase):
+        """Context manager timing the enclosed block as phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+    def total(self):
+        """Seconds since the timer was created."""
+        return time.perf_counter() - self._start
+
+    def summary(self):
+        """One-line text for the status bar, e.g. 'scan 12 ms, sort 3 ms, total 20 ms'."""
+        parts = [f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in self.seconds.items()]
+        parts.append(f"total {self.total() * 1000:.0f} ms")
+        return ", ".join(parts)
+
+    def record(self):
+        """JSON-ready dict with the phase timings in milliseconds."""
+        return {"timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), "action": self.action, **self.info,
+                "total_ms": round(self.total() * 1000, 1),
+                "phases_ms": {phase: round(seconds * 1000, 1) for phase, seconds in self.seconds.items()}}
+
+
+def phase(timer, name):
+    """timer.phase(name), or a context that does nothing if timer is None (profiling off)."""
+    return timer.phase(name) if timer is not None else nullcontext()
+
+
+def run_cprofile(func, output_file):
+    """Calls func() under cProfile and saves the statistics to output_file, even if func fails.
+
+    Only the calling thread is profiled; worker threads report through PhaseTimer.
+    """
+    import cProfile # Only loaded when asked for
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func)
+    finally:
+        profiler.dump_stats(output_file)
+
+
+def append_stats(record, stats_file=PROFILE_STATS_FILE):
+    """Appends record as one JSON line to stats_file; returns False if it could not be written."""
+    try:
+        stats_file = pathlib.Path(stats_file)
+        stats_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(stats_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError:
+        return False
+    return True
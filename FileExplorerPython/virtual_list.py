@@ -0,0 +1,312 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualListView(ttk.Frame):
+    """A multi-column Listbox replacement that only draws the rows currently on screen.
+
+    Rows live in a plain Python list (the backing store), optionally viewed
+    through an order list of indices so re-sorting only swaps that list. Cells
+    are turned into text by cell_text only when drawn; the canvas holds a fixed
+    pool of text items per visible row, which are re-labelled on scroll. Drawing
+    cost therefore depends on the window height, not on the number of rows. The
+    methods mirror tk.Listbox (insert, delete, get, size, curselection, see,
+    selection_set, bind) so callers written for a Listbox keep working, and
+    like a Listbox it sends <<ListboxSelect>> when the user changes the selection.
+
+    columns is a list of (column_id, title, width, anchor); a width of None
+    makes that column take the remaining space. Clicking a header calls
+    on_header_click(column_id).
+    """
+
+    def __init__(self, master, columns, cell_text, font=None, yscrollcommand=None,
+                 on_header_click=None,
+                 background="white", foreground="black",
+                 selectbackground="#0078D7", selectforeground="white", **kwargs):
+        super().__init__(master, **kwargs)
+        self.columns = columns
+        self.cell_text = cell_text # cell_text(row, column_id) -> str
+        self.font = font
+        self.yscrollcommand = yscrollcommand
+        self.on_header_click = on_header_click
+        self.colors = {
+            "background": background,
+            "foreground": foreground,
+            "selectbackground": selectbackground,
+            "selectforeground": selectforeground,
+        }
+
+        # --- Backing store ---
+        self._rows = [] # Row objects (records)
+        self._order = None # Display position -> index into _rows, or None for natural order
+        self._placeholder = "" # Greyed text shown when there are no rows
+        self._selected = None # Display position of the selected row, or None
+        self._top = 0 # Display position of the first visible row
+        self._sort_column = None # Column showing a sort arrow in the header
+        self._sort_descending = False
+
+        # --- Drawing surface ---
+        linespace = font.metrics("linespace") if font is not None else 16
+        self.row_height = linespace + 4 # Some vertical breathing room per row
+        self._ellipsis_width = font.measure("…") if font is not None else 8
+        self.header = tk.Canvas(self, height=self.row_height + 2, background="#ECECEC", highlightthickness=0)
+        self.header.pack(fill=tk.X)
+        self.canvas = tk.Canvas(self, background=background, highlightthickness=0, takefocus=1)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self._pool = [] # (rectangle_id, [text_id per column]) per visible row slot
+        self._column_x = [] # (left, width) per column, recomputed on resize
+
+        # --- Bindings ---
+        self.canvas.bind("<Configure>", self._on_configure)
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.header.bind("<Button-1>", self._on_header_click)
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel) # Windows and macOS
+        self.canvas.bind("<Button-4>", lambda e: self.yview("scroll", -3, "units")) # X11 wheel up
+        self.canvas.bind("<Button-5>", lambda e: self.yview("scroll", 3, "units")) # X11 wheel down
+        self.canvas.bind("<Up>", lambda e: self._move_selection(-1))
+        self.canvas.bind("<Down>", lambda e: self._move_selection(1))
+        self.canvas.bind("<Prior>", lambda e: self._move_selection(-self._visible_rows())) # Page Up
+        self.canvas.bind("<Next>", lambda e: self._move_selection(self._visible_rows())) # Page Down
+        self.canvas.bind("<Home>", lambda e: self._select_and_show(0))
+        self.canvas.bind("<End>", lambda e: self._select_and_show(self.size() - 1))
+
+    # --- Listbox-compatible API ---
+
+    def insert(self, index, *items):
+        """Adds rows in natural order; only appending (index tk.END) is supported."""
+        if index != tk.END and index != len(self._rows):
+            raise ValueError("VirtualListView only supports appending rows")
+        if self._order is not None:
+            raise ValueError("Cannot append to a sorted view; use set_items instead")
+        self._rows.extend(items)
+        self._redraw()
+
+    def set_items(self, items, order=None):
+        """Replaces all rows with the given list (taken over without copying).
+
+        order, if given, is a list of indices into items giving the display order.
+        """
+        self._rows = items
+        self._order = order
+        self._selected = None
+        self._top = 0
+        self._redraw()
+
+    def set_order(self, order):
+        """Changes the display order (or subset) of the current rows, keeping the selected row selected."""
+        selected_index = self._row_index(self._selected) if self._selected is not None else None
+        self._order = order
+        if selected_index is not None:
+            try:
+                self._selected = order.index(selected_index) if order is not None else selected_index
+            except ValueError:
+                self._selected = None # The selected row is not part of the new order (filtered out)
+            else:
+                self.see(self._selected)
+        self._redraw()
+
+    def delete(self, first, last=None):
+        """Removes rows; only clearing everything (0, tk.END) is supported."""
+        if first != 0 or last != tk.END:
+            raise ValueError("VirtualListView only supports delete(0, tk.END)")
+        self.set_items([])
+
+    def get(self, index):
+        """Returns the row object shown at display position index."""
+        if index == tk.END:
+            index = self.size() - 1
+        return self._rows[self._row_index(index)]
+
+    def get_items(self):
+        """Returns the backing list of row objects (not a copy), in natural order."""
+        return self._rows
+
+    def size(self):
+        """Returns the number of rows."""
+        return len(self._order) if self._order is not None else len(self._rows)
+
+    def set_placeholder(self, text):
+        """Sets the greyed text shown while the list is empty (e.g. "(Directory is empty)")."""
+        self._placeholder = text
+        self._redraw()
+
+    def set_sort_indicator(self, column_id, descending=False):
+        """Shows a sort arrow next to a column title."""
+        self._sort_column = column_id
+        self._sort_descending = descending
+        self._draw_header()
+
+    def curselection(self):
+        """Returns a tuple with the selected index, like Listbox.curselection()."""
+        return () if self._selected is None else (self._selected,)
+
+    def selection_clear(self, first=0, last=None):
+        """Clears the selection."""
+        self._selected = None
+        self._redraw()
+
+    def selection_set(self, index):
+        """Selects a single row."""
+        if 0 <= index < self.size():
+            self._selected = index
+            self._redraw()
+
+    def refresh(self):
+        """Redraws the visible rows, e.g. after the row objects changed."""
+        self._redraw()
+
+    def see(self, index):
+        """Scrolls so that the row at index is visible."""
+        visible = self._visible_rows()
+        if index < self._top:
+            self._top = index
+        elif index >= self._top + visible:
+            self._top = index - visible + 1
+        self._redraw()
+
+    def bind(self, sequence=None, func=None, add=None):
+        """Binds events on the drawing canvas, which is what receives clicks and keys."""
+        return self.canvas.bind(sequence, func, add)
+
+    def focus_set(self):
+        self.canvas.focus_set()
+
+    def yview(self, *args):
+        """Scrollbar protocol: 'moveto fraction' or 'scroll n units|pages'."""
+        if not args:
+            return self._view_fractions()
+        if args[0] == "moveto":
+            self._top = int(float(args[1]) * self.size())
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= max(1, self._visible_rows() - 1)
+            self._top += step
+        self._redraw()
+
+    # --- Internal helpers ---
+
+    def _row_index(self, position):
+        return self._order[position] if self._order is not None else position
+
+    def _visible_rows(self):
+        """Number of rows that fit in the canvas (at least one)."""
+        return max(1, self.canvas.winfo_height() // self.row_height)
+
+    def _view_fractions(self):
+        total = self.size()
+        if total == 0:
+            return (0.0, 1.0)
+        return (self._top / total, min(1.0, (self._top + self._visible_rows()) / total))
+
+    def _layout_columns(self, width):
+        """Computes (left, width) per column; the flexible column gets what is left."""
+        fixed = sum(w for _, _, w, _ in self.columns if w is not None)
+        flexible = max(50, width - fixed)
+        self._column_x = []
+        left = 0
+        for _, _, w, _ in self.columns:
+            w = flexible if w is None else w
+            self._column_x.append((left, w))
+            left += w
+
+    def _draw_header(self):
+        self.header.delete("all")
+        for (column_id, title, _, anchor), (left, width) in zip(self.columns, self._column_x):
+            if column_id == self._sort_column:
+                title += " ▼" if self._sort_descending else " ▲"
+            x = left + 4 if anchor == tk.W else left + width - 6
+            self.header.create_text(x, (self.row_height + 2) // 2, text=title, anchor=anchor, font=self.font)
+            self.header.create_line(left + width - 1, 2, left + width - 1, self.row_height, fill="#C0C0C0")
+
+    def _on_configure(self, event=None):
+        """Resizes the pool of drawn rows to match the new canvas size."""
+        width = self.canvas.winfo_width()
+        self._layout_columns(width)
+        self._draw_header()
+
+        # Column layout may have changed: rebuild the whole pool
+        for rect, texts in self._pool:
+            self.canvas.delete(rect)
+            for text in texts:
+                self.canvas.delete(text)
+        self._pool = []
+        needed = self._visible_rows() + 1 # One extra for a partially visible last row
+        for slot in range(needed):
+            y = slot * self.row_height
+            rect = self.canvas.create_rectangle(0, y, width, y + self.row_height, width=0)
+            texts = []
+            for (_, _, _, anchor), (left, col_width) in zip(self.columns, self._column_x):
+                x = left + 4 if anchor == tk.W else left + col_width - 6
+                texts.append(self.canvas.create_text(x, y + self.row_height // 2, anchor=anchor, font=self.font))
+            self._pool.append((rect, texts))
+        self._redraw()
+
+    def _fit(self, text, width):
+        """Truncates text with an ellipsis so it fits in width pixels."""
+        if self.font is None or not text or self.font.measure(text) <= width:
+            return text
+        # Shrink proportionally first, then trim the last few characters
+        keep = max(0, int(len(text) * width / self.font.measure(text)))
+        while keep > 0 and self.font.measure(text[:keep]) + self._ellipsis_width > width:
+            keep -= 1
+        return text[:keep] + "…"
+
+    def _redraw(self):
+        """Relabels the pooled canvas items for the rows currently in view."""
+        total = self.size()
+        visible = self._visible_rows()
+        self._top = max(0, min(self._top, total - visible))
+
+        for slot, (rect, texts) in enumerate(self._pool):
+            position = self._top + slot
+            if position < total:
+                row = self._rows[self._row_index(position)]
+                selected = position == self._selected
+                background = self.colors["selectbackground"] if selected else self.colors["background"]
+                foreground = self.colors["selectforeground"] if selected else self.colors["foreground"]
+                self.canvas.itemconfigure(rect, fill=background)
+                for (column_id, _, _, _), (_, col_width), text in zip(self.columns, self._column_x, texts):
+                    cell = self._fit(self.cell_text(row, column_id), col_width - 10)
+                    self.canvas.itemconfigure(text, text=cell, fill=foreground)
+            else:
+                self.canvas.itemconfigure(rect, fill=self.colors["background"])
+                for text in texts:
+                    self.canvas.itemconfigure(text, text="")
+                if position == 0 and self._placeholder:
+                    self.canvas.itemconfigure(texts[0], text=self._placeholder, fill="grey")
+
+        if self.yscrollcommand is not None:
+            self.yscrollcommand(*self._view_fractions())
+
+    def _on_click(self, event):
+        self.canvas.focus_set()
+        position = self._top + event.y // self.row_height
+        if position < self.size():
+            self.selection_set(position)
+            self.canvas.event_generate("<<ListboxSelect>>")
+
+    def _on_header_click(self, event):
+        if self.on_header_click is None:
+            return
+        for (column_id, _, _, _), (left, width) in zip(self.columns, self._column_x):
+            if left <= event.x < left + width:
+                self.on_header_click(column_id)
+                return
+
+    def _on_mousewheel(self, event):
+        # event.delta is a multiple of 120 on Windows, small values on macOS
+        step = -1 if event.delta > 0 else 1
+        self.yview("scroll", step * 3, "units")
+
+    def _move_selection(self, step):
+        if not self.size():
+            return
+        current = self._selected if self._selected is not None else self._top - (1 if step > 0 else 0)
+        self._select_and_show(max(0, min(self.size() - 1, current + step)))
+
+    def _select_and_show(self, index):
+        if 0 <= index < self.size():
+            self._selected = index
+            self.see(index)
+            self.canvas.event_generate("<<ListboxSelect>>")